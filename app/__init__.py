@@ -1,17 +1,39 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(ambiente=None, config=None):
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'sua-chave-secreta'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///temperatura.db'
+
+    from .instance.config import AMBIENTES
+    ambiente = ambiente or os.environ.get('APP_AMBIENTE', 'desenvolvimento')
+    app.config.from_object(AMBIENTES[ambiente])
+    app.config.from_envvar('APP_CONFIG', silent=True)
+    app.config.update(config or {})
+
     db.init_app(app)
-    Migrate(app, db)
+
+    from .banco import configurar_sqlite
+    with app.app_context():
+        configurar_sqlite(db.engine, app.config.get('SQLITE_PRAGMAS'))
+
+    from .busca import ignorar_no_autogenerate
+    Migrate(app, db, include_object=ignorar_no_autogenerate)
 
     from . import routes
     app.register_blueprint(routes.bp)
 
+    from . import api
+    app.register_blueprint(api.bp)
+
+    from .metricas import configurar_metricas
+    with app.app_context():
+        configurar_metricas(app, db.engine, [routes.bp, api.bp])
+
+    from .comandos import registrar_comandos
+    registrar_comandos(app)
+
     return app
@@ -0,0 +1,220 @@
+import base64
+import json
+from datetime import date, datetime, timezone
+from functools import wraps
+from flask import Blueprint, request, jsonify, url_for
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+from . import db
+from .models import Setor, Termometro, Verificacao
+from .tokens import origem_da_requisicao
+
+# API JSON somente leitura, versionada pelo prefixo da URL.
+# Paginação por chave (cursor opaco sobre o id), filtros de período,
+# seleção de campos (?campos=a,b) e GET condicional por ETag.
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+CAMPOS_TERMOMETRO = {
+    'id': Termometro.id,
+    'identificacao': Termometro.identificacao,
+    'setor': select(Setor.nome).where(Setor.id == Termometro.setor_id).scalar_subquery().label('setor'),
+    'equipamento': Termometro.equipamento,
+    'especificacao': Termometro.especificacao,
+    'padrao_identificacao': Termometro.padrao_identificacao,
+}
+
+CAMPOS_LEITURA = {
+    'id': Verificacao.id,
+    'termometro_id': Verificacao.termometro_id,
+    'data_hora': Verificacao.data_hora,
+    'data_sp': Verificacao.data_sp,
+    'temperatura_atual': Verificacao.temperatura_atual,
+    'temperatura_max': Verificacao.temperatura_max,
+    'temperatura_min': Verificacao.temperatura_min,
+    'responsavel': Verificacao.responsavel,
+    'observacao': Verificacao.observacao,
+    'atualizado_em': Verificacao.atualizado_em,
+}
+
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+@bp.errorhandler(ErroApi)
+def _erro_api(e):
+    return jsonify({'erro': e.mensagem}), e.status
+
+
+@bp.errorhandler(HTTPException)
+def _erro_http(e):
+    return jsonify({'erro': e.description}), e.code
+
+
+def autenticado(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if origem_da_requisicao('API_TOKENS') is None:
+            raise ErroApi('Não autenticado.', 401)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# =========================
+# Parâmetros
+# =========================
+def _codificar_cursor(ultimo_id):
+    return base64.urlsafe_b64encode(json.dumps({'id': ultimo_id}).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        preenchido = cursor + '=' * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(preenchido))['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ErroApi('Cursor inválido.')
+
+
+def _limite():
+    limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ErroApi(f'limite deve estar entre 1 e {LIMITE_MAXIMO}.')
+    return limite
+
+
+def _campos(disponiveis):
+    """Colunas pedidas em ?campos= (todas por padrão); o id sempre vem, pois é o cursor."""
+    pedidos = request.args.get('campos')
+    if not pedidos:
+        return list(disponiveis)
+    nomes = [c.strip() for c in pedidos.split(',') if c.strip()]
+    desconhecidos = [c for c in nomes if c not in disponiveis]
+    if desconhecidos:
+        raise ErroApi(f'Campos desconhecidos: {", ".join(desconhecidos)}. '
+                      f'Disponíveis: {", ".join(disponiveis)}.')
+    return ['id'] + [c for c in nomes if c != 'id']
+
+
+def _data(nome):
+    valor = request.args.get(nome)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ErroApi(f'{nome} deve estar no formato AAAA-MM-DD.')
+
+
+def _data_hora_utc(nome):
+    """Data/hora ISO 8601; com fuso é convertida para UTC naive (como está gravado)."""
+    valor = request.args.get(nome)
+    if not valor:
+        return None
+    try:
+        data_hora = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except ValueError:
+        raise ErroApi(f'{nome} deve estar no formato ISO 8601 (ex.: 2025-08-01T12:00:00Z).')
+    if data_hora.tzinfo is not None:
+        data_hora = data_hora.astimezone(timezone.utc).replace(tzinfo=None)
+    return data_hora
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(timespec='seconds') + 'Z'  # gravado em UTC
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+# =========================
+# Resposta paginada
+# =========================
+def _pagina(modelo, colunas_disponiveis, filtros, endpoint, **valores_url):
+    """Executa a consulta por chave e monta a resposta JSON condicional (ETag/304)."""
+    campos = _campos(colunas_disponiveis)
+    limite = _limite()
+
+    consulta = db.session.query(*[colunas_disponiveis[c] for c in campos]).filter(*filtros)
+    cursor = request.args.get('cursor')
+    if cursor:
+        consulta = consulta.filter(modelo.id > _decodificar_cursor(cursor))
+    linhas = consulta.order_by(modelo.id).limit(limite + 1).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = _codificar_cursor(linhas[-1].id)
+
+    dados = [{c: _serializar(v) for c, v in zip(campos, linha)} for linha in linhas]
+    corpo = {'dados': dados, 'proximo': proximo}
+    if proximo:
+        argumentos = request.args.to_dict()
+        argumentos['cursor'] = proximo
+        corpo['links'] = {'proximo': url_for(endpoint, **valores_url, **argumentos, _external=True)}
+
+    resposta = jsonify(corpo)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+
+# =========================
+# Rotas
+# =========================
+@bp.route('/termometros')
+@autenticado
+def listar_termometros():
+    filtros = []
+    setor = request.args.get('setor')
+    if setor:
+        filtros.append(Termometro.setor.has(Setor.nome == setor))
+    return _pagina(Termometro, CAMPOS_TERMOMETRO, filtros, 'api.listar_termometros')
+
+
+@bp.route('/termometros/<int:id>')
+@autenticado
+def detalhar_termometro(id):
+    campos = _campos(CAMPOS_TERMOMETRO)
+    linha = db.session.query(*[CAMPOS_TERMOMETRO[c] for c in campos]).filter(Termometro.id == id).first()
+    if linha is None:
+        raise ErroApi('Termômetro não encontrado.', 404)
+    resposta = jsonify({c: _serializar(v) for c, v in zip(campos, linha)})
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+
+@bp.route('/leituras')
+@bp.route('/termometros/<int:id>/leituras')
+@autenticado
+def listar_leituras(id=None):
+    """Leituras em ordem de id.
+
+    Filtros: termometro (id), desde/ate (dia local de SP, inclusivos) e
+    alterado_desde (data/hora ISO): com ele o cliente puxa só as leituras
+    novas ou editadas desde a última sincronização.
+    """
+    termometro_id = id or request.args.get('termometro', type=int)
+    if id is not None:
+        Termometro.query.get_or_404(id, description='Termômetro não encontrado.')
+
+    filtros = []
+    if termometro_id:
+        filtros.append(Verificacao.termometro_id == termometro_id)
+    desde, ate = _data('desde'), _data('ate')
+    if desde:
+        filtros.append(Verificacao.data_sp >= desde)
+    if ate:
+        filtros.append(Verificacao.data_sp <= ate)
+    alterado_desde = _data_hora_utc('alterado_desde')
+    if alterado_desde:
+        filtros.append(Verificacao.atualizado_em > alterado_desde)
+
+    return _pagina(Verificacao, CAMPOS_LEITURA, filtros, 'api.listar_leituras', **({'id': id} if id else {}))
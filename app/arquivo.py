@@ -0,0 +1,193 @@
+import os
+from datetime import date
+from pathlib import Path
+from flask import current_app
+from sqlalchemy import func, select
+from . import db
+from .models import Verificacao, ViolacaoControle
+from .tempo import para_sp
+
+# Arquivo frio: leituras de anos fechados saem da tabela verificacao e vão para
+# instance/arquivo/<termometro_id>/<ano>.parquet (um arquivo por termômetro e ano
+# local de SP). estatistica_mensal e status_diario continuam cobrindo esses anos.
+COLUNAS = [
+    'id', 'termometro_id', 'data_hora', 'data_sp', 'mes_sp', 'temperatura_atual',
+    'temperatura_max', 'temperatura_min', 'responsavel', 'observacao', 'atualizado_em',
+]
+COMPRESSAO = 'zstd'
+ANOS_QUENTES_PADRAO = 2  # ano corrente e o anterior ficam no SQLite
+
+
+class LeituraArquivada:
+    """Leitura lida do arquivo, com a mesma interface de Verificacao usada nas telas."""
+
+    __slots__ = COLUNAS
+    arquivada = True
+
+    def __init__(self, **valores):
+        for coluna in COLUNAS:
+            setattr(self, coluna, valores.get(coluna))
+
+    def get_data_hora_sp(self):
+        return para_sp(self.data_hora)
+
+
+def pasta_arquivo():
+    return Path(current_app.instance_path) / 'arquivo'
+
+
+def caminho_arquivo(termometro_id, ano):
+    return pasta_arquivo() / str(termometro_id) / f'{ano}.parquet'
+
+
+def anos_arquivados(termometro_id):
+    """Anos com arquivo do termômetro (só lista o diretório; não abre os arquivos)."""
+    pasta = pasta_arquivo() / str(termometro_id)
+    if not pasta.is_dir():
+        return []
+    return sorted(int(p.stem) for p in pasta.glob('*.parquet') if p.stem.isdigit())
+
+
+def termometros_arquivados():
+    pasta = pasta_arquivo()
+    if not pasta.is_dir():
+        return []
+    return sorted(int(p.name) for p in pasta.iterdir() if p.is_dir() and p.name.isdigit())
+
+
+def ler_arquivo(termometro_id, ano, mes_sp=None):
+    """DataFrame das leituras arquivadas (opcionalmente só de um mês), em ordem de data_hora."""
+    import pandas as pd
+
+    caminho = caminho_arquivo(termometro_id, ano)
+    if not caminho.exists():
+        return pd.DataFrame(columns=COLUNAS)
+    filtros = [('mes_sp', '==', mes_sp)] if mes_sp else None
+    df = pd.read_parquet(caminho, engine='pyarrow', filters=filtros)
+    return df.sort_values(['data_hora', 'id'], kind='stable').reset_index(drop=True)
+
+
+def _para_leituras(df):
+    registros = df.astype(object).where(df.notna(), None).to_dict('records')
+    for r in registros:
+        if r['data_hora'] is not None:
+            r['data_hora'] = r['data_hora'].to_pydatetime()
+        if r['data_sp'] is not None and not isinstance(r['data_sp'], date):
+            r['data_sp'] = r['data_sp'].date()
+    return [LeituraArquivada(**r) for r in registros]
+
+
+def leituras_arquivadas(termometro_id, mes_sp=None, anos=None):
+    """Leituras arquivadas do termômetro (de um mês, de alguns anos ou todas), em ordem cronológica."""
+    if mes_sp:
+        ano = int(mes_sp[:4])
+        if ano not in anos_arquivados(termometro_id):
+            return []
+        return _para_leituras(ler_arquivo(termometro_id, ano, mes_sp))
+
+    leituras = []
+    for ano in anos if anos is not None else anos_arquivados(termometro_id):
+        leituras += _para_leituras(ler_arquivo(termometro_id, ano))
+    return leituras
+
+
+def combinar(arquivadas, quentes):
+    """Junta leituras arquivadas e da tabela, em ordem cronológica.
+
+    Se um arquivamento foi interrompido entre gravar o arquivo e apagar as
+    leituras, a mesma leitura está nos dois lugares: vale a da tabela.
+    """
+    na_tabela = {(v.id, v.data_hora) for v in quentes}
+    leituras = [a for a in arquivadas if (a.id, a.data_hora) not in na_tabela] + list(quentes)
+    return sorted(leituras, key=lambda v: (v.data_hora, v.id))
+
+
+def mes_arquivado(termometro_id, mes_sp):
+    return int(mes_sp[:4]) in anos_arquivados(termometro_id)
+
+
+def leituras_do_mes(termometro_id, mes_sp):
+    """Leituras de um mês em ordem cronológica, da tabela e (se o ano foi arquivado) do Parquet."""
+    leituras = Verificacao.query.filter(
+        Verificacao.termometro_id == termometro_id,
+        Verificacao.mes_sp == mes_sp
+    ).order_by(Verificacao.data_hora).all()
+    if mes_arquivado(termometro_id, mes_sp):
+        leituras = combinar(leituras_arquivadas(termometro_id, mes_sp), leituras)
+    return leituras
+
+
+def ano_limite_padrao():
+    """Primeiro ano que fica no SQLite, conforme ARQUIVO_ANOS_QUENTES."""
+    from .tempo import hoje_sp
+
+    quentes = current_app.config.get('ARQUIVO_ANOS_QUENTES', ANOS_QUENTES_PADRAO)
+    return hoje_sp().year - quentes + 1
+
+
+def anos_para_arquivar(ano_limite):
+    """[(termometro_id, ano, qtd)] das leituras anteriores a 1º/jan do ano_limite."""
+    ano = func.substr(Verificacao.mes_sp, 1, 4)
+    consulta = (
+        db.session.query(Verificacao.termometro_id, ano, func.count(Verificacao.id))
+        .filter(Verificacao.data_sp < date(ano_limite, 1, 1), Verificacao.termometro_id.isnot(None))
+        .group_by(Verificacao.termometro_id, ano)
+        .order_by(Verificacao.termometro_id, ano)
+    )
+    return [(termometro_id, int(a), qtd) for termometro_id, a, qtd in consulta]
+
+
+def arquivar(ano_limite, lote_exclusao=900):
+    """Move para Parquet as leituras anteriores ao ano_limite e as apaga do SQLite.
+
+    Cada (termômetro, ano) é tratado de uma vez: o arquivo é gravado (e
+    mesclado com o que já estava arquivado, se houver leituras tardias daquele
+    ano) antes das leituras saírem do banco, numa transação por arquivo.
+    As violações da carta dessas leituras também são apagadas, e a versão de
+    cada mês arquivado é incrementada (os caches por versão apontam para os ids
+    da tabela). Retorna (leituras arquivadas, arquivos gravados). Faz commit.
+    """
+    import pandas as pd
+    from .estatistica import tocar  # estatistica importa este módulo
+
+    total = arquivos = 0
+    for termometro_id, ano, _ in anos_para_arquivar(ano_limite):
+        consulta = (
+            select(*[getattr(Verificacao, c) for c in COLUNAS])
+            .where(Verificacao.termometro_id == termometro_id,
+                   Verificacao.data_sp >= date(ano, 1, 1), Verificacao.data_sp < date(ano + 1, 1, 1))
+        )
+        novas = pd.DataFrame(db.session.execute(consulta).all(), columns=COLUNAS)
+        if novas.empty:
+            continue
+
+        existentes = ler_arquivo(termometro_id, ano)
+        df = pd.concat([existentes, novas], ignore_index=True) if not existentes.empty else novas
+        df['data_hora'] = pd.to_datetime(df['data_hora'])
+        df['atualizado_em'] = pd.to_datetime(df['atualizado_em'])
+        df['data_sp'] = pd.to_datetime(df['data_sp']).dt.date
+        for coluna in ('temperatura_atual', 'temperatura_max', 'temperatura_min'):
+            df[coluna] = df[coluna].astype('float64')
+        # O SQLite reaproveita o maior id depois de uma exclusão, então o id sozinho
+        # não identifica a leitura entre arquivo e tabela: a chave é (id, data_hora)
+        df = df.drop_duplicates(['id', 'data_hora'], keep='last')
+        df = df.sort_values(['data_hora', 'id']).reset_index(drop=True)
+
+        destino = caminho_arquivo(termometro_id, ano)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporario = destino.with_name(f'.{destino.name}.{os.getpid()}.tmp')
+        df.to_parquet(temporario, engine='pyarrow', compression=COMPRESSAO, index=False)
+        os.replace(temporario, destino)
+
+        ids = novas['id'].tolist()
+        for inicio in range(0, len(ids), lote_exclusao):
+            parte = ids[inicio:inicio + lote_exclusao]
+            ViolacaoControle.query.filter(ViolacaoControle.verificacao_id.in_(parte)).delete(synchronize_session=False)
+            Verificacao.query.filter(Verificacao.id.in_(parte)).delete(synchronize_session=False)
+        for mes in sorted(novas['mes_sp'].unique()):
+            tocar(termometro_id, mes)
+        db.session.commit()
+
+        total += len(ids)
+        arquivos += 1
+    return total, arquivos
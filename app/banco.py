@@ -0,0 +1,149 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import case, create_engine, event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+
+
+def aplicar_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+    finally:
+        cursor.close()
+
+
+def configurar_sqlite(engine, pragmas):
+    """Registra os PRAGMAs para serem aplicados em cada nova conexão do pool."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _ao_conectar(dbapi_connection, connection_record):
+        aplicar_pragmas(dbapi_connection, pragmas)
+
+
+def _erro_de_lock(erro):
+    return 'database is locked' in str(erro) or 'database is busy' in str(erro)
+
+
+def teste_estresse(pragmas, escritores=8, leitores=8, operacoes=200, termometros=20):
+    """Simula o início de turno: várias threads gravando e lendo leituras ao mesmo tempo.
+
+    Roda num banco SQLite descartável (nunca no banco do sistema) com o esquema
+    dos modelos e os PRAGMAs informados. Cada escrita é uma transação
+    BEGIN IMMEDIATE com as mesmas gravações da rota verificar (verificacao,
+    status_diario e estatistica_mensal). Retorna um dict com a contagem de
+    operações, erros de lock e o tempo total.
+    """
+    from . import db
+    from .estatistica import comando_insercao
+    from .models import StatusDiario, Termometro, Verificacao
+    from .tempo import dia_sp, mes_sp
+
+    completa = func.max(case(
+        (Verificacao.temperatura_max.isnot(None) & Verificacao.temperatura_min.isnot(None), 1), else_=0
+    ))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # timeout=0: sem o busy_timeout dos PRAGMAs a conexão não espera pelo lock,
+        # como no SQLite puro (o driver Python esperaria 5 s e esconderia a disputa)
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'estresse.db')}",
+                               pool_size=escritores + leitores, connect_args={'timeout': 0})
+        configurar_sqlite(engine, pragmas)
+        db.metadata.create_all(engine)
+
+        with engine.begin() as conn:
+            conn.execute(Termometro.__table__.insert(), [
+                {'identificacao': f'EST-{i:03d}', 'equipamento': 'Estresse'} for i in range(termometros)
+            ])
+
+        resultado = {'escritas': 0, 'leituras': 0, 'erros_lock': 0, 'outros_erros': 0}
+        trava = threading.Lock()
+        inicio_geral = threading.Barrier(escritores + leitores)
+
+        def contar(chave):
+            with trava:
+                resultado[chave] += 1
+
+        def gravar_como_verificar(conn, termometro_id, agora, dia, temperatura):
+            """Mesmas gravações da rota verificar, na mesma transação."""
+            conn.execute(
+                select(Verificacao.id)
+                .where(Verificacao.termometro_id == termometro_id, Verificacao.data_sp == dia)
+                .limit(1)
+            ).first()
+            conn.execute(Verificacao.__table__.insert(), {
+                'termometro_id': termometro_id, 'data_hora': agora, 'atualizado_em': agora,
+                'data_sp': dia, 'mes_sp': mes_sp(dia), 'temperatura_atual': temperatura,
+                'responsavel': 'estresse'
+            })
+            qtd, completas = conn.execute(
+                select(func.count(Verificacao.id), completa)
+                .where(Verificacao.termometro_id == termometro_id, Verificacao.data_sp == dia)
+            ).one()
+            conn.execute(
+                insert(StatusDiario.__table__)
+                .values(termometro_id=termometro_id, data=dia, qtd_leituras=qtd, completo=bool(completas))
+                .on_conflict_do_update(index_elements=['termometro_id', 'data'],
+                                       set_={'qtd_leituras': qtd, 'completo': bool(completas)})
+            )
+            conn.execute(comando_insercao(termometro_id, mes_sp(dia), temperatura, dialeto='sqlite'))
+
+        def escritor(semente):
+            aleatorio = random.Random(semente)
+            inicio_geral.wait()
+            for _ in range(operacoes):
+                termometro_id = aleatorio.randint(1, termometros)
+                agora = datetime.utcnow()
+                dia = dia_sp(agora)
+                temperatura = round(aleatorio.uniform(18, 26), 1)
+                try:
+                    # AUTOCOMMIT deixa o driver sem BEGIN próprio: a transação é a do BEGIN IMMEDIATE
+                    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                        conn.exec_driver_sql('BEGIN IMMEDIATE')
+                        try:
+                            gravar_como_verificar(conn, termometro_id, agora, dia, temperatura)
+                            conn.exec_driver_sql('COMMIT')
+                        except BaseException:
+                            conn.exec_driver_sql('ROLLBACK')
+                            raise
+                    contar('escritas')
+                except OperationalError as e:
+                    contar('erros_lock' if _erro_de_lock(e) else 'outros_erros')
+
+        def leitor(semente):
+            aleatorio = random.Random(semente)
+            inicio_geral.wait()
+            for _ in range(operacoes):
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(
+                            select(Verificacao.termometro_id, func.count(Verificacao.id), func.avg(Verificacao.temperatura_atual))
+                            .where(Verificacao.termometro_id <= aleatorio.randint(1, termometros))
+                            .group_by(Verificacao.termometro_id)
+                        ).all()
+                    contar('leituras')
+                except OperationalError as e:
+                    contar('erros_lock' if _erro_de_lock(e) else 'outros_erros')
+
+        threads = [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+        threads += [threading.Thread(target=leitor, args=(1000 + i,)) for i in range(leitores)]
+
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        resultado['segundos'] = round(time.perf_counter() - inicio, 2)
+
+        with engine.connect() as conn:
+            resultado['journal_mode'] = conn.exec_driver_sql('PRAGMA journal_mode').scalar()
+        engine.dispose()
+
+    return resultado
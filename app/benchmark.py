@@ -0,0 +1,207 @@
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from . import db, create_app
+from .models import Termometro, Verificacao, Usuario
+
+# Perfis de equipamento: (equipamento, setpoint °C, desvio da leitura)
+PERFIS = [
+    ('Geladeira', 5.0, 0.8),
+    ('Freezer', -20.0, 1.5),
+    ('Estufa', 35.0, 0.5),
+    ('Câmara fria', 3.0, 0.6),
+]
+SETORES = ['Meios de Cultura', 'Microbiologia', 'Físico-Química', 'Recepção', 'Almoxarifado']
+
+TAMANHO_LOTE = 5000
+
+
+def app_benchmark(caminho_banco):
+    """App isolado apontando para o banco descartável do benchmark."""
+    return create_app('teste', config={
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(caminho_banco)}',
+        'METRICAS_CABECALHO_SQL': True,  # a contagem de SQL vem de app/metricas.py
+    })
+
+
+def gerar_dados(caminho_banco, termometros=50, anos=1, semente=42, fim=None):
+    """Cria (do zero) um banco SQLite com N termômetros x M anos de leituras diárias.
+
+    A mesma semente gera sempre os mesmos dados, então resultados de
+    execuções diferentes são comparáveis. Retorna a quantidade de leituras.
+    """
+    import numpy as np
+    import pandas as pd
+    from flask_migrate import upgrade
+    from .busca import reconstruir_indice
+    from .estatistica import reconstruir_estatisticas
+    from .setores import obter_ou_criar_setor
+    from .status_diario import reconstruir_status_diario
+    from .tempo import SP_TZ
+
+    if os.path.exists(caminho_banco):
+        os.remove(caminho_banco)
+
+    app = app_benchmark(caminho_banco)
+    with app.app_context():
+        upgrade(directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
+
+        aleatorio = np.random.default_rng(semente)
+        admin = Usuario(username='benchmark', is_admin=True)
+        admin.set_senha('benchmark')
+        db.session.add(admin)
+
+        setores = [obter_ou_criar_setor(nome) for nome in SETORES]
+        perfis = [PERFIS[i % len(PERFIS)] for i in range(termometros)]
+        db.session.execute(Termometro.__table__.insert(), [
+            {
+                'setor_id': setores[i % len(setores)].id,
+                'equipamento': f'{equipamento} {i + 1:03d}',
+                'especificacao': f'{setpoint - 3 * desvio:.0f} a {setpoint + 3 * desvio:.0f} °C',
+                'identificacao': f'GMM-TD{i + 1:03d}',
+                'padrao_identificacao': 'GMM-TD',
+            }
+            for i, (equipamento, setpoint, desvio) in enumerate(perfis)
+        ])
+        ids = [i for (i,) in db.session.query(Termometro.id).order_by(Termometro.id)]
+
+        # Uma leitura por dia, entre 7h e 10h no horário de SP
+        fim = pd.Timestamp(fim or datetime.now(SP_TZ).date())
+        dias = pd.date_range(end=fim, periods=365 * anos, freq='D')
+        agora = datetime.utcnow()
+        total = 0
+        for termometro_id, (_, setpoint, desvio) in zip(ids, perfis):
+            minutos = aleatorio.integers(7 * 60, 10 * 60, size=len(dias))
+            locais = (dias + pd.to_timedelta(minutos, unit='m')).tz_localize(SP_TZ.zone)
+            utc = locais.tz_convert('UTC').tz_localize(None)
+            atual = np.round(aleatorio.normal(setpoint, desvio, size=len(dias)), 1)
+            completo = aleatorio.random(len(dias)) < 0.9  # ~10% sem máx/mín
+
+            registros = pd.DataFrame({
+                'termometro_id': termometro_id,
+                'data_hora': utc.to_pydatetime(),
+                'data_sp': locais.date,
+                'mes_sp': locais.strftime('%Y-%m'),
+                'temperatura_atual': atual,
+                'temperatura_max': np.where(completo, atual + 1.0, np.nan),
+                'temperatura_min': np.where(completo, atual - 1.0, np.nan),
+                'responsavel': 'benchmark',
+                'atualizado_em': agora,
+            })
+            registros = registros.astype(object).where(registros.notna(), None).to_dict('records')
+            for inicio in range(0, len(registros), TAMANHO_LOTE):
+                db.session.execute(Verificacao.__table__.insert(), registros[inicio:inicio + TAMANHO_LOTE])
+            total += len(registros)
+        db.session.commit()
+
+        reconstruir_estatisticas()
+        reconstruir_status_diario()
+        reconstruir_indice()
+    return total
+
+
+def rotas_padrao(termometro_id, mes_ano):
+    """(nome, URL) das rotas mais pesadas do sistema."""
+    return [
+        ('index', '/'),
+        ('historico', f'/historico/{termometro_id}'),
+        ('historico_mes', f'/historico/{termometro_id}/{mes_ano}'),
+        ('exportar_excel', f'/exportar_excel/{termometro_id}'),
+        ('exportar_planilha_geral', '/exportar_planilha_geral'),
+        ('dados_carta_controle', f'/dados_carta_controle/{termometro_id}/{mes_ano}'),
+    ]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def executar_benchmark(caminho_banco, repeticoes=5):
+    """Mede latência, quantidade de SQL e pico de memória de cada rota.
+
+    A primeira requisição (cache frio) é registrada à parte; o pico de
+    memória vem de uma execução extra com tracemalloc, para não distorcer
+    as latências.
+    """
+    app = app_benchmark(caminho_banco)
+    resultados = {}
+    with app.app_context():
+        admin = Usuario.query.filter_by(is_admin=True).first()
+        termometro_id = db.session.query(db.func.min(Termometro.id)).scalar()
+        mes_sp = db.session.query(db.func.max(Verificacao.mes_sp)).filter(
+            Verificacao.termometro_id == termometro_id).scalar()
+        ano, mes = mes_sp.split('-')
+        qtd_leituras = Verificacao.query.count()
+        qtd_termometros = Termometro.query.count()
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['usuario_id'] = admin.id
+        sessao['usuario_nome'] = admin.username
+        sessao['is_admin'] = True
+
+    for nome, url in rotas_padrao(termometro_id, f'{mes}-{ano}'):
+        latencias = []
+        for _ in range(repeticoes + 1):
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            corpo = resposta.get_data()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        tracemalloc.start()
+        cliente.get(url).get_data()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        primeira, demais = latencias[0], latencias[1:] or latencias
+        resultados[nome] = {
+            'url': url,
+            'status': resposta.status_code,
+            'bytes': len(corpo),
+            'primeira_ms': round(primeira, 2),
+            'latencia_ms': {
+                'min': round(min(demais), 2),
+                'p50': round(statistics.median(demais), 2),
+                'p95': round(_percentil(demais, 95), 2),
+                'max': round(max(demais), 2),
+            },
+            'consultas_sql': int(resposta.headers['X-Consultas-SQL']),
+            'tempo_sql_ms': float(resposta.headers['X-Tempo-SQL-ms']),
+            'pico_memoria_kb': round(pico / 1024, 1),
+        }
+
+    return {
+        'executado_em': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'dados': {'termometros': qtd_termometros, 'leituras': qtd_leituras, 'repeticoes': repeticoes},
+        'rotas': resultados,
+    }
+
+
+def comparar(atual, base, tolerancia=0.25):
+    """Lista as regressões de 'atual' em relação a 'base' (dois resultados de executar_benchmark).
+
+    Uma rota regride se o p50 piorar mais que a tolerância (fração) ou se
+    passar a executar mais instruções SQL.
+    """
+    regressoes = []
+    for nome, medida in atual['rotas'].items():
+        anterior = base.get('rotas', {}).get(nome)
+        if anterior is None:
+            continue
+        p50, p50_base = medida['latencia_ms']['p50'], anterior['latencia_ms']['p50']
+        if p50_base and p50 > p50_base * (1 + tolerancia):
+            regressoes.append(f'{nome}: p50 {p50_base} ms -> {p50} ms')
+        if medida['consultas_sql'] > anterior['consultas_sql']:
+            regressoes.append(f"{nome}: SQL {anterior['consultas_sql']} -> {medida['consultas_sql']}")
+    return regressoes
+
+
+def salvar(resultado, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
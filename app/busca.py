@@ -0,0 +1,78 @@
+from sqlalchemy import text
+from . import db
+from .models import Termometro
+
+# Índice FTS5 "sombra" da tabela termometro (rowid = termometro.id).
+# O tokenizador trigram mantém a semântica de substring do antigo ilike('%termo%').
+TABELA_FTS = 'termometro_fts'
+TAMANHO_MINIMO_FTS = 3  # trigram não casa termos com menos de 3 caracteres
+
+
+def fts_disponivel():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ignorar_no_autogenerate(objeto, nome, tipo, refletido, comparado_com):
+    """Filtro do Alembic: a tabela virtual FTS (e suas tabelas internas) é gerida à mão."""
+    return not (tipo == 'table' and nome and nome.startswith(TABELA_FTS))
+
+
+def indexar_termometro(termometro):
+    """Insere/atualiza o termômetro no índice de busca. Não faz commit."""
+    if not fts_disponivel():
+        return
+    db.session.flush()
+    remover_termometro(termometro.id)
+    db.session.execute(
+        text(f'INSERT INTO {TABELA_FTS}(rowid, identificacao, equipamento) VALUES (:id, :identificacao, :equipamento)'),
+        {'id': termometro.id, 'identificacao': termometro.identificacao or '', 'equipamento': termometro.equipamento or ''}
+    )
+
+
+def remover_termometro(termometro_id):
+    """Remove o termômetro do índice de busca. Não faz commit."""
+    if not fts_disponivel():
+        return
+    db.session.execute(text(f'DELETE FROM {TABELA_FTS} WHERE rowid = :id'), {'id': termometro_id})
+
+
+def reconstruir_indice():
+    """Regenera o índice de busca a partir da tabela termometro. Faz commit."""
+    db.session.execute(text(f'DELETE FROM {TABELA_FTS}'))
+    db.session.execute(text(
+        f'INSERT INTO {TABELA_FTS}(rowid, identificacao, equipamento) '
+        "SELECT id, coalesce(identificacao, ''), coalesce(equipamento, '') FROM termometro"
+    ))
+    db.session.commit()
+    return Termometro.query.count()
+
+
+def filtrar_por_busca(query, termo_busca):
+    """Aplica a busca por identificação/equipamento a uma query de Termometro."""
+    if fts_disponivel() and len(termo_busca) >= TAMANHO_MINIMO_FTS:
+        # Frase entre aspas: casa o termo como substring, em qualquer das duas colunas
+        frase = '"' + termo_busca.replace('"', '""') + '"'
+        ids = text(f'SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH :frase')
+        ids = ids.bindparams(frase=frase).columns(rowid=db.Integer)
+        return query.filter(Termometro.id.in_(ids))
+
+    termo_like = f"%{termo_busca}%"
+    return query.filter(
+        (Termometro.identificacao.ilike(termo_like)) |
+        (Termometro.equipamento.ilike(termo_like))
+    )
+
+
+def paginar(query, apos=None, por_pagina=50):
+    """Paginação por chave (keyset) sobre Termometro.id.
+
+    Retorna (itens, proximo) onde 'proximo' é o id a passar em ?apos= para a
+    página seguinte, ou None se esta for a última.
+    """
+    if apos:
+        query = query.filter(Termometro.id > apos)
+    itens = query.order_by(Termometro.id).limit(por_pagina + 1).all()
+    if len(itens) > por_pagina:
+        itens = itens[:por_pagina]
+        return itens, itens[-1].id
+    return itens, None
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """Cache em memória, limitado em quantidade de itens e seguro entre threads."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._itens = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            if chave not in self._itens:
+                return padrao
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maxsize:
+                self._itens.popitem(last=False)
+
+    def pop(self, chave, padrao=None):
+        with self._lock:
+            return self._itens.pop(chave, padrao)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._itens
+
+    def __len__(self):
+        return len(self._itens)
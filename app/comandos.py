@@ -0,0 +1,314 @@
+import click
+from flask.cli import AppGroup
+
+
+# =========================
+# status_diario
+# =========================
+status_diario_cli = AppGroup('status-diario', help='Manutenção da tabela status_diario.')
+
+
+@status_diario_cli.command('reconstruir')
+@click.option('--inicio', type=click.DateTime(formats=['%Y-%m-%d']), help='Primeiro dia (SP) a regenerar.')
+@click.option('--fim', type=click.DateTime(formats=['%Y-%m-%d']), help='Último dia (SP) a regenerar.')
+def reconstruir_status_diario_cmd(inicio, fim):
+    """Regenera o status diário a partir das leituras existentes."""
+    from .status_diario import reconstruir_status_diario
+
+    total = reconstruir_status_diario(
+        inicio=inicio.date() if inicio else None,
+        fim=fim.date() if fim else None
+    )
+    click.echo(f'{total} linha(s) de status diário gravadas.')
+
+
+# =========================
+# estatistica_mensal
+# =========================
+estatisticas_cli = AppGroup('estatisticas', help='Manutenção da tabela estatistica_mensal.')
+
+
+@estatisticas_cli.command('reconstruir')
+def reconstruir_estatisticas_cmd():
+    """Regenera a estatística mensal a partir das leituras."""
+    from . import db
+    from .estatistica import reconstruir_estatisticas
+
+    total = reconstruir_estatisticas()
+    db.session.commit()
+    click.echo(f'{total} mês(es) de estatística gravados.')
+
+
+@estatisticas_cli.command('verificar')
+def verificar_estatisticas_cmd():
+    """Confere a estatística mensal contra as leituras; falha se houver divergência."""
+    from .estatistica import verificar_estatisticas
+
+    divergencias = verificar_estatisticas()
+    for linha in divergencias:
+        click.echo(linha)
+    if divergencias:
+        click.echo(f'{len(divergencias)} divergência(s). Rode "flask estatisticas reconstruir".')
+        raise SystemExit(1)
+    click.echo('Estatística mensal confere com as leituras.')
+
+
+# =========================
+# Índice de busca (FTS5)
+# =========================
+busca_cli = AppGroup('busca', help='Manutenção do índice de busca de termômetros.')
+
+
+@busca_cli.command('reconstruir')
+def reconstruir_busca_cmd():
+    """Regenera o índice FTS5 a partir da tabela termometro."""
+    from .busca import reconstruir_indice
+
+    total = reconstruir_indice()
+    click.echo(f'{total} termômetro(s) indexados.')
+
+
+# =========================
+# Exportações em segundo plano
+# =========================
+exportacoes_cli = AppGroup('exportacoes', help='Manutenção das exportações em segundo plano.')
+
+
+@exportacoes_cli.command('limpar')
+def limpar_exportacoes_cmd():
+    """Apaga tarefas e arquivos de exportação mais antigos que a retenção configurada."""
+    from .tarefas import limpar_exportacoes_antigas
+
+    total = limpar_exportacoes_antigas()
+    click.echo(f'{total} exportação(ões) antigas removidas.')
+
+
+# =========================
+# QR codes e etiquetas
+# =========================
+etiquetas_cli = AppGroup('etiquetas', help='Geração em lote de QR codes e etiquetas.')
+
+
+@etiquetas_cli.command('gerar')
+@click.option('--url-base', help='Endereço do sistema gravado nos QR codes (ex.: http://192.168.1.20:5010). '
+                                 'Padrão: URL_BASE da configuração.')
+@click.option('--saida', default='etiquetas_termometros.docx', show_default=True,
+              type=click.Path(dir_okay=False), help='Documento Word com as etiquetas.')
+@click.option('--workers', type=int, help='Processos em paralelo (padrão: nº de CPUs).')
+@click.option('--forcar', is_flag=True, help='Regera todos os QR codes, mesmo os atualizados.')
+@click.option('--sem-documento', is_flag=True, help='Só atualiza os PNGs, sem montar o documento.')
+def gerar_etiquetas_cmd(url_base, saida, workers, forcar, sem_documento):
+    """Atualiza os QR codes dos termômetros cadastrados e monta a folha de etiquetas."""
+    from flask import current_app
+    from .etiquetas import gerar_qrcodes, montar_folha_etiquetas
+
+    url_base = url_base or current_app.config.get('URL_BASE')
+    if not url_base:
+        raise click.UsageError('Informe --url-base ou defina URL_BASE na configuração.')
+
+    itens, gerados = gerar_qrcodes(url_base, workers=workers, forcar=forcar)
+    click.echo(f'{gerados} QR code(s) gerados, {len(itens) - gerados} já estavam atualizados.')
+
+    if not sem_documento and itens:
+        montar_folha_etiquetas(itens, saida)
+        click.echo(f'Etiquetas salvas em {saida}')
+
+
+# =========================
+# Banco de dados
+# =========================
+banco_cli = AppGroup('banco', help='Diagnóstico do banco de dados.')
+
+
+@banco_cli.command('estresse')
+@click.option('--escritores', default=8, show_default=True, help='Threads gravando leituras.')
+@click.option('--leitores', default=8, show_default=True, help='Threads consultando leituras.')
+@click.option('--operacoes', default=200, show_default=True, help='Operações por thread.')
+@click.option('--sem-pragmas', is_flag=True, help='Roda com os padrões do SQLite, para comparação.')
+def estresse_banco_cmd(escritores, leitores, operacoes, sem_pragmas):
+    """Grava e lê em paralelo num banco descartável; falha se houver "database is locked"."""
+    from flask import current_app
+    from .banco import teste_estresse
+
+    pragmas = {} if sem_pragmas else current_app.config.get('SQLITE_PRAGMAS', {})
+    resultado = teste_estresse(pragmas, escritores=escritores, leitores=leitores, operacoes=operacoes)
+
+    click.echo(f"journal_mode={resultado['journal_mode']} em {resultado['segundos']}s: "
+               f"{resultado['escritas']} escrita(s), {resultado['leituras']} leitura(s), "
+               f"{resultado['erros_lock']} erro(s) de lock, {resultado['outros_erros']} outro(s) erro(s).")
+    if resultado['erros_lock'] or resultado['outros_erros']:
+        raise SystemExit(1)
+
+
+# =========================
+# Leituras (ingestão em massa)
+# =========================
+leituras_cli = AppGroup('leituras', help='Importação de leituras em massa.')
+
+
+@leituras_cli.command('importar')
+@click.argument('arquivos', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--responsavel', default='cli', show_default=True,
+              help='Responsável gravado nas leituras sem a coluna "responsavel".')
+def importar_leituras_cmd(arquivos, responsavel):
+    """Importa arquivos CSV/JSON de data loggers (reimportar o mesmo arquivo não duplica)."""
+    import os
+    from .ingestao import importar_lote, LoteInvalido
+
+    falhas = 0
+    for caminho in arquivos:
+        with open(caminho, 'rb') as f:
+            conteudo = f.read()
+        formato = 'json' if caminho.lower().endswith('.json') else 'csv'
+        try:
+            lote, novo = importar_lote(conteudo, formato=formato, origem=responsavel,
+                                       arquivo=os.path.basename(caminho))
+        except LoteInvalido as e:
+            falhas += 1
+            click.echo(f'{caminho}: lote inválido')
+            for linha, mensagem in e.erros:
+                click.echo(f'  linha {linha}: {mensagem}' if linha else f'  {mensagem}')
+            continue
+        if novo:
+            click.echo(f'{caminho}: {lote.qtd_leituras} leitura(s) importadas.')
+        else:
+            click.echo(f'{caminho}: já importado em {lote.criado_em:%d/%m/%Y %H:%M} (UTC), ignorado.')
+
+    if falhas:
+        raise SystemExit(1)
+
+
+# =========================
+# Arquivo frio (Parquet)
+# =========================
+arquivo_cli = AppGroup('arquivo', help='Arquivamento de leituras antigas em Parquet.')
+
+
+@arquivo_cli.command('arquivar')
+@click.option('--antes-de', 'ano_limite', type=int,
+              help='Arquiva as leituras de anos anteriores a este (padrão: conforme ARQUIVO_ANOS_QUENTES).')
+@click.option('--simular', is_flag=True, help='Só lista o que seria arquivado.')
+@click.option('--vacuum', is_flag=True, help='Roda VACUUM no fim, devolvendo o espaço ao disco.')
+def arquivar_cmd(ano_limite, simular, vacuum):
+    """Move as leituras de anos antigos para instance/arquivo/<termômetro>/<ano>.parquet."""
+    from . import db
+    from .arquivo import ano_limite_padrao, anos_para_arquivar, arquivar
+
+    ano_limite = ano_limite or ano_limite_padrao()
+    if simular:
+        pendentes = anos_para_arquivar(ano_limite)
+        for termometro_id, ano, qtd in pendentes:
+            click.echo(f'termômetro {termometro_id}, {ano}: {qtd} leitura(s)')
+        click.echo(f'{sum(qtd for _, _, qtd in pendentes)} leitura(s) anteriores a {ano_limite} seriam arquivadas.')
+        return
+
+    total, arquivos = arquivar(ano_limite)
+    click.echo(f'{total} leitura(s) anteriores a {ano_limite} arquivadas em {arquivos} arquivo(s).')
+    if vacuum and total and db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conexao:
+            conexao.exec_driver_sql('VACUUM')
+        click.echo('VACUUM concluído.')
+
+
+# =========================
+# Relatórios PDF
+# =========================
+relatorios_cli = AppGroup('relatorios', help='Cartas controle mensais em PDF.')
+
+
+@relatorios_cli.command('gerar')
+@click.argument('mes', type=click.DateTime(formats=['%m-%Y', '%Y-%m']))
+@click.option('--setor', 'setores', multiple=True, help='Só os termômetros deste setor (pode repetir).')
+@click.option('--por-setor', is_flag=True, help='Um PDF por setor em vez de um por termômetro.')
+@click.option('--saida', type=click.Path(file_okay=False), help='Copia os PDFs para esta pasta.')
+def gerar_relatorios_cmd(mes, setores, por_setor, saida):
+    """Gera (em paralelo) os PDFs do mês; os que já estão no cache não são refeitos."""
+    import shutil
+    from pathlib import Path
+    from .relatorios import gerar_lote, PdfIndisponivel
+    from .tempo import mes_sp
+
+    try:
+        relatorios = gerar_lote(mes_sp(mes), setores=list(setores) or None, por_setor=por_setor)
+    except PdfIndisponivel as e:
+        raise click.ClickException(str(e))
+
+    gerados = sum(1 for _, _, gerado in relatorios if gerado)
+    click.echo(f'{len(relatorios)} relatório(s): {gerados} gerado(s), {len(relatorios) - gerados} do cache.')
+    if saida:
+        Path(saida).mkdir(parents=True, exist_ok=True)
+        for caminho, nome, _ in relatorios:
+            shutil.copyfile(caminho, Path(saida) / nome)
+        click.echo(f'PDFs copiados para {saida}')
+
+
+# =========================
+# Benchmark das rotas
+# =========================
+benchmark_cli = AppGroup('benchmark', help='Dados sintéticos e medição de desempenho das rotas.')
+
+
+@benchmark_cli.command('gerar')
+@click.argument('banco', type=click.Path(dir_okay=False))
+@click.option('--termometros', default=50, show_default=True, help='Quantidade de termômetros.')
+@click.option('--anos', default=1, show_default=True, help='Anos de leituras diárias por termômetro.')
+@click.option('--semente', default=42, show_default=True, help='Semente do gerador (mesma semente, mesmos dados).')
+def gerar_benchmark_cmd(banco, termometros, anos, semente):
+    """Cria um banco SQLite descartável com dados sintéticos (nunca o banco do sistema)."""
+    from .benchmark import gerar_dados
+
+    total = gerar_dados(banco, termometros=termometros, anos=anos, semente=semente)
+    click.echo(f'{banco}: {termometros} termômetro(s), {total} leitura(s).')
+
+
+@benchmark_cli.command('executar')
+@click.option('--banco', type=click.Path(dir_okay=False),
+              help='Banco gerado por "flask benchmark gerar" (padrão: gera um temporário).')
+@click.option('--termometros', default=50, show_default=True, help='Usado só quando o banco é gerado.')
+@click.option('--anos', default=1, show_default=True, help='Usado só quando o banco é gerado.')
+@click.option('--semente', default=42, show_default=True, help='Usado só quando o banco é gerado.')
+@click.option('--repeticoes', default=5, show_default=True, help='Requisições medidas por rota.')
+@click.option('--saida', type=click.Path(dir_okay=False), help='Grava o resultado em JSON.')
+@click.option('--comparar', 'base', type=click.Path(exists=True, dir_okay=False),
+              help='JSON de uma execução anterior: falha se alguma rota regredir.')
+@click.option('--tolerancia', default=0.25, show_default=True, help='Piora aceitável do p50 (fração).')
+def executar_benchmark_cmd(banco, termometros, anos, semente, repeticoes, saida, base, tolerancia):
+    """Mede latência, consultas SQL e pico de memória das rotas mais pesadas."""
+    import json
+    import tempfile
+    from .benchmark import gerar_dados, executar_benchmark, comparar, salvar
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if not banco:
+            banco = f'{pasta}/benchmark.db'
+            gerar_dados(banco, termometros=termometros, anos=anos, semente=semente)
+        resultado = executar_benchmark(banco, repeticoes=repeticoes)
+
+    for nome, medida in resultado['rotas'].items():
+        click.echo(f"{nome:<26} {medida['status']}  p50 {medida['latencia_ms']['p50']:>9.2f} ms  "
+                   f"1ª {medida['primeira_ms']:>9.2f} ms  SQL {medida['consultas_sql']:>4}  "
+                   f"pico {medida['pico_memoria_kb']:>9.1f} KB")
+    if saida:
+        salvar(resultado, saida)
+        click.echo(f'Resultado salvo em {saida}')
+
+    if base:
+        with open(base, encoding='utf-8') as f:
+            regressoes = comparar(resultado, json.load(f), tolerancia=tolerancia)
+        for linha in regressoes:
+            click.echo(f'REGRESSÃO {linha}')
+        if regressoes:
+            raise SystemExit(1)
+
+
+def registrar_comandos(app):
+    app.cli.add_command(status_diario_cli)
+    app.cli.add_command(estatisticas_cli)
+    app.cli.add_command(busca_cli)
+    app.cli.add_command(exportacoes_cli)
+    app.cli.add_command(etiquetas_cli)
+    app.cli.add_command(banco_cli)
+    app.cli.add_command(leituras_cli)
+    app.cli.add_command(benchmark_cli)
+    app.cli.add_command(arquivo_cli)
+    app.cli.add_command(relatorios_cli)
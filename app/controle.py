@@ -0,0 +1,127 @@
+from . import db
+from .models import Verificacao, ViolacaoControle
+from .estatistica import obter, desvio_padrao
+
+# Regras no estilo Western Electric, avaliadas a cada leitura gravada
+REGRAS = {
+    'alem_3s': 'Ponto além de ±3S',
+    '2_de_3_alem_2s': '2 de 3 pontos seguidos além de 2S (mesmo lado)',
+    'sequencia_8': '8 pontos seguidos do mesmo lado da média',
+}
+
+# Com poucas leituras no mês os limites ainda não dizem nada
+MINIMO_LEITURAS = 5
+TAMANHO_SEQUENCIA = 8
+
+
+def estatistica_do_mes(termometro_id, chave_mes, sem_valor=None):
+    """(n, média, desvio amostral) do mês, lidos de estatistica_mensal em O(1).
+
+    'sem_valor' tira uma temperatura da conta (Welford inverso): o ponto
+    avaliado não entra nos próprios limites (senão um valor extremo alarga o
+    desvio e se esconde).
+    """
+    linha = obter(termometro_id, chave_mes)
+    if linha is None:
+        return 0, 0.0, 0.0
+    n, media, m2 = linha.n, linha.media, linha.m2
+    if sem_valor is not None and n > 0:
+        if n == 1:
+            return 0, 0.0, 0.0
+        media_sem = (n * media - sem_valor) / (n - 1)
+        m2 -= (sem_valor - media_sem) * (sem_valor - media)
+        n, media = n - 1, media_sem
+    return n, media, desvio_padrao(n, m2)
+
+
+def _regras_quebradas(valores, media, desvio):
+    """Regras quebradas pelo último ponto de 'valores' (em ordem cronológica)."""
+    atual = valores[-1]
+    lado = 1 if atual > media else -1 if atual < media else 0
+    quebradas = []
+
+    if abs(atual - media) > 3 * desvio:
+        quebradas.append('alem_3s')
+
+    ultimos_3 = valores[-3:]
+    alem_2s = [v for v in ultimos_3 if (v - media) * lado > 2 * desvio]
+    if lado and len(ultimos_3) == 3 and len(alem_2s) >= 2 and (atual - media) * lado > 2 * desvio:
+        quebradas.append('2_de_3_alem_2s')
+
+    sequencia = valores[-TAMANHO_SEQUENCIA:]
+    if lado and len(sequencia) == TAMANHO_SEQUENCIA and all((v - media) * lado > 0 for v in sequencia):
+        quebradas.append('sequencia_8')
+
+    return quebradas
+
+
+def avaliar_leitura(verificacao):
+    """Avalia as regras da carta para uma leitura recém-gravada ou editada.
+
+    Usa a estatística do mês (sem a própria leitura) e só as últimas leituras até ela
+    (nenhuma varredura do histórico). Chamar depois de atualizar estatistica_mensal.
+    Substitui as violações anteriores da leitura. Não faz commit. Retorna a
+    lista de violações gravadas.
+    """
+    db.session.flush()
+    remover_violacoes(verificacao_id=verificacao.id)
+    if verificacao.temperatura_atual is None or verificacao.termometro_id is None:
+        return []
+
+    n, media, desvio = estatistica_do_mes(verificacao.termometro_id, verificacao.mes_sp,
+                                          sem_valor=verificacao.temperatura_atual)
+    if n < MINIMO_LEITURAS or desvio == 0:
+        return []
+
+    recentes = (
+        db.session.query(Verificacao.temperatura_atual)
+        .filter(
+            Verificacao.termometro_id == verificacao.termometro_id,
+            Verificacao.mes_sp == verificacao.mes_sp,
+            Verificacao.temperatura_atual.isnot(None),
+            Verificacao.data_hora <= verificacao.data_hora,
+            Verificacao.id != verificacao.id,
+        )
+        .order_by(Verificacao.data_hora.desc())
+        .limit(TAMANHO_SEQUENCIA - 1)
+        .all()
+    )
+    valores = [v for (v,) in reversed(recentes)] + [verificacao.temperatura_atual]
+
+    violacoes = [
+        ViolacaoControle(
+            termometro_id=verificacao.termometro_id,
+            verificacao_id=verificacao.id,
+            regra=regra,
+            mes_sp=verificacao.mes_sp,
+            valor=verificacao.temperatura_atual,
+            media=media,
+            desvio=desvio,
+        )
+        for regra in _regras_quebradas(valores, media, desvio)
+    ]
+    db.session.add_all(violacoes)
+    return violacoes
+
+
+def remover_violacoes(verificacao_id=None, termometro_id=None):
+    """Apaga as violações de uma leitura ou de um termômetro. Não faz commit."""
+    if verificacao_id is None and termometro_id is None:
+        return
+    consulta = ViolacaoControle.query
+    if verificacao_id is not None:
+        consulta = consulta.filter(ViolacaoControle.verificacao_id == verificacao_id)
+    if termometro_id is not None:
+        consulta = consulta.filter(ViolacaoControle.termometro_id == termometro_id)
+    consulta.delete(synchronize_session=False)
+
+
+def violacoes_recentes(limite=10):
+    """Últimas violações registradas, para o painel da página inicial."""
+    return (
+        ViolacaoControle.query
+        .options(db.joinedload(ViolacaoControle.termometro), db.joinedload(ViolacaoControle.verificacao))
+        .order_by(ViolacaoControle.id.desc())
+        .limit(limite)
+        .all()
+    )
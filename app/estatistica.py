@@ -0,0 +1,277 @@
+import math
+from sqlalchemy import bindparam, case, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+from .models import Verificacao, EstatisticaMensal
+from .arquivo import anos_arquivados, ler_arquivo, mes_arquivado, termometros_arquivados
+
+T = EstatisticaMensal.__table__
+
+# Tolerâncias da verificação contra as leituras (flask estatisticas verificar)
+TOLERANCIA_RELATIVA = 1e-9
+TOLERANCIA_M2 = 1e-6
+
+
+def desvio_padrao(n, m2):
+    """Desvio padrão amostral (igual ao Excel) a partir de n e M2."""
+    return math.sqrt(max(m2, 0.0) / (n - 1)) if n > 1 else 0.0
+
+
+def _insert(dialeto=None):
+    dialeto = dialeto or db.engine.dialect.name
+    return (postgresql if dialeto == 'postgresql' else sqlite).insert(T)
+
+
+# =========================
+# Atualizações incrementais
+# =========================
+# Todas são um único UPDATE/UPSERT atômico calculado pelo banco com os valores
+# antigos da linha: duas gravações simultâneas não perdem atualização.
+# Nenhuma faz commit; devem ser chamadas na transação que alterou a leitura.
+
+def comando_insercao(termometro_id, mes, x, dialeto=None):
+    """UPSERT que soma o valor x (ou só a contagem, se None) ao mês. Usado também por app/banco.py."""
+    valores = {'termometro_id': termometro_id, 'mes_sp': mes,
+               'qtd_leituras': 1, 'n': 0, 'media': 0.0, 'm2': 0.0, 'versao': 1}
+    alteracoes = {'qtd_leituras': T.c.qtd_leituras + 1, 'versao': T.c.versao + 1}
+    if x is not None:
+        valores.update(n=1, media=x, minimo=x, maximo=x)
+        nova_media = T.c.media + (x - T.c.media) / (T.c.n + 1)
+        alteracoes.update(
+            n=T.c.n + 1,
+            media=nova_media,
+            m2=T.c.m2 + (x - T.c.media) * (x - nova_media),
+            minimo=case((T.c.minimo.is_(None) | (T.c.minimo > x), x), else_=T.c.minimo),
+            maximo=case((T.c.maximo.is_(None) | (T.c.maximo < x), x), else_=T.c.maximo),
+        )
+    return _insert(dialeto).values(**valores).on_conflict_do_update(
+        index_elements=['termometro_id', 'mes_sp'], set_=alteracoes
+    )
+
+
+def registrar_insercao(verificacao):
+    """Soma uma leitura nova à estatística do mês dela."""
+    db.session.flush()
+    db.session.execute(comando_insercao(verificacao.termometro_id, verificacao.mes_sp, verificacao.temperatura_atual))
+
+
+def registrar_remocao(verificacao):
+    """Tira da estatística uma leitura excluída (chamar depois do db.session.delete)."""
+    db.session.flush()
+    termometro_id, mes = verificacao.termometro_id, verificacao.mes_sp
+    x = verificacao.temperatura_atual
+    _remover_valor(termometro_id, mes, x, qtd_leituras=1)
+
+    # A linha não é apagada quando o mês fica vazio: a versão precisa continuar
+    # crescendo, senão um mês recriado repetiria uma versão já usada em cache
+    linha = obter(termometro_id, mes)
+    if linha is None:
+        return
+    if x is not None and (linha.minimo is None or x <= linha.minimo or x >= linha.maximo):
+        _recalcular_extremos(termometro_id, mes)
+
+
+def registrar_alteracao(verificacao, temperatura_anterior):
+    """Leitura editada: troca o valor antigo pelo novo (ou só muda a versão do mês)."""
+    db.session.flush()
+    x = verificacao.temperatura_atual
+    if temperatura_anterior == x:
+        tocar(verificacao.termometro_id, verificacao.mes_sp)
+        return
+    _remover_valor(verificacao.termometro_id, verificacao.mes_sp, temperatura_anterior, qtd_leituras=1)
+    registrar_insercao(verificacao)
+    if temperatura_anterior is not None:
+        _recalcular_extremos(verificacao.termometro_id, verificacao.mes_sp)
+
+
+def tocar(termometro_id, mes):
+    """Só incrementa a versão do mês (ex.: mudou máx/mín ou observação de uma leitura)."""
+    db.session.flush()
+    db.session.execute(
+        T.update()
+        .where(T.c.termometro_id == termometro_id, T.c.mes_sp == mes)
+        .values(versao=T.c.versao + 1)
+    )
+
+
+def _remover_valor(termometro_id, mes, x, qtd_leituras):
+    """Welford inverso: n-1, média e M2 sem o valor x."""
+    alteracoes = {'qtd_leituras': T.c.qtd_leituras - qtd_leituras, 'versao': T.c.versao + 1}
+    if x is not None:
+        media_sem_x = case((T.c.n <= 1, 0.0), else_=(T.c.n * T.c.media - x) / (T.c.n - 1))
+        alteracoes.update(
+            n=T.c.n - 1,
+            media=media_sem_x,
+            m2=case((T.c.n <= 1, 0.0), else_=T.c.m2 - (x - media_sem_x) * (x - T.c.media)),
+        )
+    db.session.execute(
+        T.update().where(T.c.termometro_id == termometro_id, T.c.mes_sp == mes).values(**alteracoes)
+    )
+
+
+def _recalcular_extremos(termometro_id, mes):
+    """Mínimo/máximo não se desfazem incrementalmente: relê só os dois extremos do mês (índice)."""
+    minimo, maximo = db.session.query(
+        func.min(Verificacao.temperatura_atual), func.max(Verificacao.temperatura_atual)
+    ).filter(Verificacao.termometro_id == termometro_id, Verificacao.mes_sp == mes).one()
+    if mes_arquivado(termometro_id, mes):
+        arquivadas = ler_arquivo(termometro_id, int(mes[:4]), mes)['temperatura_atual'].dropna()
+        if not arquivadas.empty:
+            minimo = min(float(arquivadas.min()), minimo) if minimo is not None else float(arquivadas.min())
+            maximo = max(float(arquivadas.max()), maximo) if maximo is not None else float(arquivadas.max())
+    db.session.execute(
+        T.update().where(T.c.termometro_id == termometro_id, T.c.mes_sp == mes)
+        .values(minimo=minimo, maximo=maximo)
+    )
+
+
+# =========================
+# Leitura
+# =========================
+def obter(termometro_id, mes):
+    """Linha corrente do mês (lida do banco, nunca do identity map) ou None."""
+    return db.session.execute(
+        select(T).where(T.c.termometro_id == termometro_id, T.c.mes_sp == mes)
+    ).first()
+
+
+def meses_do_termometro(termometro_id):
+    """Linhas dos meses com leituras do termômetro, em ordem cronológica."""
+    return db.session.execute(
+        select(T).where(T.c.termometro_id == termometro_id, T.c.qtd_leituras > 0).order_by(T.c.mes_sp)
+    ).all()
+
+
+# =========================
+# Reconstrução e verificação
+# =========================
+def _agregado_das_leituras(termometro_ids=None, meses=None):
+    """Estatística recalculada das leituras, em duas passadas (média e depois M2) no banco."""
+    filtros = ['v.termometro_id IS NOT NULL', 'v.mes_sp IS NOT NULL']
+    parametros = {}
+    if termometro_ids is not None:
+        filtros.append('v.termometro_id IN :termometros')
+        parametros['termometros'] = list(termometro_ids)
+    if meses is not None:
+        filtros.append('v.mes_sp IN :meses')
+        parametros['meses'] = list(meses)
+    onde = ' AND '.join(filtros)
+    sql = text(f'''
+        SELECT v.termometro_id, v.mes_sp,
+               COUNT(v.id) AS qtd_leituras,
+               COUNT(v.temperatura_atual) AS n,
+               COALESCE(g.media, 0.0) AS media,
+               COALESCE(SUM((v.temperatura_atual - g.media) * (v.temperatura_atual - g.media)), 0.0) AS m2,
+               MIN(v.temperatura_atual) AS minimo,
+               MAX(v.temperatura_atual) AS maximo
+        FROM verificacao v
+        JOIN (
+            SELECT termometro_id, mes_sp, AVG(temperatura_atual) AS media
+            FROM verificacao v WHERE {onde}
+            GROUP BY termometro_id, mes_sp
+        ) g ON g.termometro_id = v.termometro_id AND g.mes_sp = v.mes_sp
+        WHERE {onde}
+        GROUP BY v.termometro_id, v.mes_sp
+    ''')
+    if termometro_ids is not None:
+        sql = sql.bindparams(bindparam('termometros', expanding=True))
+    if meses is not None:
+        sql = sql.bindparams(bindparam('meses', expanding=True))
+    return db.session.execute(sql, parametros).mappings().all()
+
+
+def _agregado_arquivado(termometro_ids=None, meses=None):
+    """Estatística dos meses de anos arquivados: leituras do Parquet mais as tardias da tabela."""
+    import pandas as pd
+
+    linhas = []
+    for termometro_id in termometros_arquivados():
+        if termometro_ids is not None and termometro_id not in termometro_ids:
+            continue
+        for ano in anos_arquivados(termometro_id):
+            if meses is not None and not any(m.startswith(f'{ano}-') for m in meses):
+                continue
+            colunas = ['id', 'data_hora', 'mes_sp', 'temperatura_atual']
+            quentes = db.session.query(
+                Verificacao.id, Verificacao.data_hora, Verificacao.mes_sp, Verificacao.temperatura_atual
+            ).filter(Verificacao.termometro_id == termometro_id,
+                     Verificacao.mes_sp.like(f'{ano}-%')).all()
+            df = pd.concat([
+                ler_arquivo(termometro_id, ano)[colunas],
+                pd.DataFrame(quentes, columns=colunas).astype({'data_hora': 'datetime64[us]'}),
+            ], ignore_index=True)
+            df = df.drop_duplicates(['id', 'data_hora'], keep='last')
+            if meses is not None:
+                df = df[df['mes_sp'].isin(meses)]
+            for mes, valores in df.groupby('mes_sp')['temperatura_atual']:
+                valores = valores.dropna().astype('float64')
+                media = float(valores.mean()) if len(valores) else 0.0
+                linhas.append({
+                    'termometro_id': termometro_id, 'mes_sp': mes,
+                    'qtd_leituras': int(len(df[df['mes_sp'] == mes])), 'n': int(len(valores)),
+                    'media': media, 'm2': float(((valores - media) ** 2).sum()),
+                    'minimo': float(valores.min()) if len(valores) else None,
+                    'maximo': float(valores.max()) if len(valores) else None,
+                })
+    return linhas
+
+
+def _agregado(termometro_ids=None, meses=None):
+    """{(termometro_id, mes_sp): estatística} das leituras, incluindo os anos arquivados."""
+    agregado = {(l['termometro_id'], l['mes_sp']): dict(l)
+                for l in _agregado_das_leituras(termometro_ids, meses)}
+    # Num ano arquivado o resultado do Parquet (que já inclui as leituras tardias) prevalece
+    agregado.update({(l['termometro_id'], l['mes_sp']): l
+                     for l in _agregado_arquivado(termometro_ids, meses)})
+    return agregado
+
+
+def reconstruir_estatisticas(termometro_ids=None, meses=None):
+    """Regrava a estatística a partir das leituras (tudo ou só o recorte informado).
+
+    As versões continuam crescendo (caches antigos não são reaproveitados).
+    Usada pela ingestão em massa e pelo comando de manutenção. Não faz commit.
+    Retorna a quantidade de linhas gravadas.
+    """
+    db.session.flush()
+    antigas = select(T.c.termometro_id, T.c.mes_sp, T.c.versao)
+    apagar = T.delete()
+    if termometro_ids is not None:
+        antigas = antigas.where(T.c.termometro_id.in_(termometro_ids))
+        apagar = apagar.where(T.c.termometro_id.in_(termometro_ids))
+    if meses is not None:
+        antigas = antigas.where(T.c.mes_sp.in_(meses))
+        apagar = apagar.where(T.c.mes_sp.in_(meses))
+    versoes = {(t, m): v for t, m, v in db.session.execute(antigas)}
+
+    linhas = [dict(linha, versao=versoes.pop(chave, 0) + 1)
+              for chave, linha in _agregado(termometro_ids, meses).items()]
+    # Meses que ficaram sem leituras continuam na tabela, zerados (ver registrar_remocao)
+    linhas += [{'termometro_id': t, 'mes_sp': m, 'qtd_leituras': 0, 'n': 0, 'media': 0.0, 'm2': 0.0,
+                'minimo': None, 'maximo': None, 'versao': v + 1} for (t, m), v in versoes.items()]
+    db.session.execute(apagar)
+    if linhas:
+        db.session.execute(T.insert(), linhas)
+    return len(linhas)
+
+
+def verificar_estatisticas():
+    """Compara a tabela com as leituras. Retorna a lista de divergências (texto)."""
+    esperadas = _agregado()
+    gravadas = {(l.termometro_id, l.mes_sp): l._mapping
+                for l in db.session.execute(select(T).where(T.c.qtd_leituras > 0))}
+
+    divergencias = []
+    for chave in sorted(set(esperadas) | set(gravadas), key=str):
+        esperada, gravada = esperadas.get(chave), gravadas.get(chave)
+        if esperada is None or gravada is None:
+            divergencias.append(f'{chave}: {"sobrando na tabela" if esperada is None else "faltando na tabela"}')
+            continue
+        for campo in ('qtd_leituras', 'n', 'minimo', 'maximo'):
+            if esperada[campo] != gravada[campo]:
+                divergencias.append(f'{chave} {campo}: tabela {gravada[campo]} x leituras {esperada[campo]}')
+        if not math.isclose(gravada['media'], esperada['media'], rel_tol=TOLERANCIA_RELATIVA, abs_tol=1e-9):
+            divergencias.append(f"{chave} media: tabela {gravada['media']} x leituras {esperada['media']}")
+        if not math.isclose(gravada['m2'], esperada['m2'], rel_tol=TOLERANCIA_M2, abs_tol=1e-6):
+            divergencias.append(f"{chave} m2: tabela {gravada['m2']} x leituras {esperada['m2']}")
+    return divergencias
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import qrcode
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from flask import current_app, url_for
+from .models import Termometro
+from .qr import OPCOES_PADRAO
+
+# Chave do texto gravado no PNG com a URL codificada (detecta QR desatualizado)
+CHAVE_URL_PNG = 'URL'
+
+
+def pasta_qrcodes():
+    return Path(current_app.root_path) / 'static' / 'qrcodes'
+
+
+def caminho_qr(termometro, pasta=None):
+    return (pasta or pasta_qrcodes()) / f'{termometro.identificacao}.png'
+
+
+def qr_desatualizado(caminho, url):
+    """True se o PNG não existe ou codifica outra URL (ex.: mudou o endereço do servidor)."""
+    try:
+        with Image.open(caminho) as img:
+            return img.text.get(CHAVE_URL_PNG) != url
+    except (FileNotFoundError, OSError):
+        return True
+
+
+def gravar_qr(url, caminho):
+    """Renderiza o QR code e grava o PNG com a URL embutida nos metadados."""
+    info = PngInfo()
+    info.add_text(CHAVE_URL_PNG, url)
+    img = qrcode.make(url, **OPCOES_PADRAO)
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f'.{caminho.name}.{os.getpid()}.tmp')
+    img.save(temporario, format='PNG', pnginfo=info)
+    os.replace(temporario, caminho)
+
+
+def _atualizar_qr(args):
+    """Executado nos processos do pool: (url, caminho, forcar) -> True se gerou o PNG."""
+    url, caminho, forcar = args
+    if not forcar and not qr_desatualizado(caminho, url):
+        return False
+    gravar_qr(url, caminho)
+    return True
+
+
+def gerar_qrcodes(url_base, pasta=None, workers=None, forcar=False):
+    """Gera, em paralelo, os QR codes faltantes ou desatualizados de todos os termômetros.
+
+    Retorna (termometros, gerados) onde 'termometros' é a lista de
+    (identificacao, caminho) ordenada pela identificação, pronta para a folha de etiquetas.
+    """
+    pasta = Path(pasta) if pasta else pasta_qrcodes()
+    termometros = (
+        Termometro.query
+        .filter(Termometro.identificacao.isnot(None), Termometro.identificacao != '')
+        .order_by(Termometro.identificacao)
+        .all()
+    )
+
+    # A CLI não tem requisição: monta as URLs externas a partir de url_base
+    with current_app.test_request_context(base_url=url_base):
+        tarefas = [
+            (url_for('main.verificar', id=t.id, _external=True), str(caminho_qr(t, pasta)), forcar)
+            for t in termometros
+        ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        gerados = sum(pool.map(_atualizar_qr, tarefas, chunksize=16))
+
+    return [(t.identificacao, caminho) for t, (_, caminho, _) in zip(termometros, tarefas)], gerados
+
+
+def montar_folha_etiquetas(itens, destino, linhas=7, colunas=3, tamanho_cm=2.5):
+    """Monta o .docx com os QR codes em grade (padrão 7x3 por página) e a identificação abaixo."""
+    from docx import Document
+    from docx.shared import Cm, Pt
+
+    documento = Document()
+    tamanho_img = Cm(tamanho_cm)
+    por_pagina = linhas * colunas
+
+    for i in range(0, len(itens), por_pagina):
+        bloco = itens[i:i + por_pagina]
+        tabela = documento.add_table(rows=linhas, cols=colunas)
+
+        for idx, (identificacao, caminho) in enumerate(bloco):
+            paragrafo = tabela.cell(idx // colunas, idx % colunas).paragraphs[0]
+            paragrafo.alignment = 1  # Centraliza
+
+            run = paragrafo.add_run()
+            run.add_picture(caminho, width=tamanho_img, height=tamanho_img)
+
+            # Nome abaixo
+            run = paragrafo.add_run(f"\n{identificacao}")
+            run.font.size = Pt(8)
+
+        if i + por_pagina < len(itens):
+            documento.add_page_break()
+
+    documento.save(destino)
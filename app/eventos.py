@@ -0,0 +1,213 @@
+import json
+import queue
+import time
+import uuid
+from collections import deque
+from threading import Lock, Thread
+from flask import current_app
+from . import db
+from .models import StatusDiario, Termometro
+from .setores import contagens_de_hoje
+from .tempo import hoje_sp
+
+# Eventos de status do painel (SSE em /eventos/status).
+# Cada processo tem um Hub que entrega os eventos às conexões abertas nele;
+# o backend decide como um evento publicado chega aos hubs: direto (um
+# processo) ou pelo Redis (vários workers/máquinas), como no limitador de login.
+DURACAO_MAXIMA_PADRAO = 300  # segundos; o navegador reconecta sozinho depois
+PING_SEGUNDOS_PADRAO = 15
+
+
+class Assinatura:
+    def __init__(self, tamanho):
+        self.fila = queue.Queue(maxsize=tamanho)
+        self.ativa = True
+
+
+class Hub:
+    """Distribui os eventos às assinaturas deste processo (uma fila por conexão), seguro entre threads.
+
+    Guarda os últimos eventos para quem reconecta com Last-Event-ID. Os ids
+    levam um token do hub: vindo de outro processo (ou antigo demais), o
+    cliente é mandado recarregar a página em vez de perder atualizações.
+    """
+
+    def __init__(self, tamanho_fila=100, historico=200):
+        self.token = uuid.uuid4().hex[:8]
+        self._tamanho_fila = tamanho_fila
+        self._assinaturas = set()
+        self._recentes = deque(maxlen=historico)
+        self._seq = 0
+        self._lock = Lock()
+
+    def assinar(self):
+        assinatura = Assinatura(self._tamanho_fila)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def entregar(self, evento):
+        with self._lock:
+            self._seq += 1
+            item = (f'{self.token}:{self._seq}', evento)
+            self._recentes.append(item)
+            for assinatura in list(self._assinaturas):
+                try:
+                    assinatura.fila.put_nowait(item)
+                except queue.Full:
+                    # Conexão que não consome: sai do hub e o cliente recarrega ao voltar
+                    assinatura.ativa = False
+                    self._assinaturas.discard(assinatura)
+
+    def desde(self, ultimo_id):
+        """Eventos depois de ultimo_id, ou None se não dá para saber o que o cliente perdeu."""
+        token, _, seq = (ultimo_id or '').partition(':')
+        if token != self.token or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._lock:
+            recentes = list(self._recentes)
+            atual = self._seq
+        primeiro = _seq(recentes[0][0]) if recentes else atual + 1
+        if seq > atual or seq + 1 < primeiro:  # id inválido ou eventos que já saíram do histórico
+            return None
+        return [item for item in recentes if _seq(item[0]) > seq]
+
+    def __len__(self):
+        return len(self._assinaturas)
+
+
+class MemoriaBackend:
+    """Um processo só: publicar é entregar ao hub local."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publicar(self, evento):
+        self.hub.entregar(evento)
+
+
+class RedisBackend:
+    """Publica num canal do Redis; uma thread por processo repassa as mensagens ao hub local."""
+
+    def __init__(self, url, hub, canal='eventos-status'):
+        import redis  # dependência opcional: só é necessária com EVENTOS_REDIS_URL
+
+        self.hub = hub
+        self._redis = redis.Redis.from_url(url)
+        self._canal = canal
+        self._erro_conexao = redis.ConnectionError
+        Thread(target=self._escutar, name='eventos-redis', daemon=True).start()
+
+    def publicar(self, evento):
+        self._redis.publish(self._canal, json.dumps(evento))
+
+    def _escutar(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._canal)
+                for mensagem in pubsub.listen():
+                    self.hub.entregar(json.loads(mensagem['data']))
+            except self._erro_conexao:
+                time.sleep(1)
+
+
+def obter_backend():
+    """Backend de eventos do app, criado na primeira chamada conforme a configuração."""
+    backend = current_app.extensions.get('eventos')
+    if backend is None:
+        hub = Hub()
+        url_redis = current_app.config.get('EVENTOS_REDIS_URL')
+        backend = RedisBackend(url_redis, hub) if url_redis else MemoriaBackend(hub)
+        current_app.extensions['eventos'] = backend
+    return backend
+
+
+# =========================
+# Publicação
+# =========================
+def evento_status(termometro_id):
+    """Situação de hoje do termômetro e as contagens do setor dele (o delta que o painel aplica)."""
+    termometro = db.session.get(Termometro, termometro_id)
+    if termometro is None:
+        return None
+    status = StatusDiario.query.filter_by(termometro_id=termometro_id, data=hoje_sp()).first()
+    if status is None:
+        situacao = 'atrasado'
+    else:
+        situacao = 'em_dia' if status.completo else 'incompleto'
+
+    evento = {'tipo': 'status', 'termometro_id': termometro_id, 'status': situacao, 'setor': None}
+    if termometro.setor is not None:
+        total, atrasados, incompletos = contagens_de_hoje(termometro.setor)
+        evento['setor'] = {'id': termometro.setor_id, 'termometros': total,
+                           'atrasados': atrasados, 'incompletos': incompletos}
+    return evento
+
+
+def publicar_status(termometro_id, dia):
+    """Chamar depois do commit de uma leitura do dia 'dia'. Só o dia de hoje muda o painel.
+
+    Uma falha aqui (ex.: Redis fora do ar) não desfaz nem derruba a gravação.
+    """
+    if dia != hoje_sp():
+        return
+    try:
+        evento = evento_status(termometro_id)
+        if evento is not None:
+            obter_backend().publicar(evento)
+    except Exception:
+        current_app.logger.exception('Falha ao publicar o status do termômetro %s', termometro_id)
+
+
+# =========================
+# Fluxo SSE
+# =========================
+def _seq(id_evento):
+    return int(id_evento.split(':')[1])
+
+
+def _formatar(id_evento, evento):
+    return f"id: {id_evento}\nevent: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+
+def fluxo_sse(ultimo_id=None):
+    """Gerador do corpo text/event-stream de uma conexão (não usa o banco nem o contexto do app)."""
+    hub = obter_backend().hub
+    duracao = current_app.config.get('EVENTOS_DURACAO_MAXIMA', DURACAO_MAXIMA_PADRAO)
+    ping = current_app.config.get('EVENTOS_PING_SEGUNDOS', PING_SEGUNDOS_PADRAO)
+
+    def gerar():
+        assinatura = hub.assinar()
+        perdidos = hub.desde(ultimo_id) if ultimo_id else []
+        try:
+            yield 'retry: 3000\n\n'
+            if perdidos is None:
+                yield 'event: recarregar\ndata: {}\n\n'
+                return
+            for id_evento, evento in perdidos:
+                yield _formatar(id_evento, evento)
+            # O que chegou na fila entre assinar e ler o histórico já foi enviado acima
+            enviado = _seq(perdidos[-1][0]) if perdidos else 0
+
+            fim = time.monotonic() + duracao
+            while time.monotonic() < fim:
+                try:
+                    id_evento, evento = assinatura.fila.get(timeout=ping)
+                except queue.Empty:
+                    if not assinatura.ativa:
+                        yield 'event: recarregar\ndata: {}\n\n'
+                        return
+                    yield ': ping\n\n'  # mantém a conexão viva em proxies
+                    continue
+                if _seq(id_evento) > enviado:
+                    yield _formatar(id_evento, evento)
+        finally:
+            hub.cancelar(assinatura)
+
+    return gerar()
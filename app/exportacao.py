@@ -0,0 +1,139 @@
+import re
+import xlsxwriter
+from sqlalchemy import select
+from . import db
+from .arquivo import anos_arquivados, ler_arquivo
+from .models import Termometro, Verificacao
+from .tempo import converter_para_sp
+
+COLUNAS_PLANILHA_GERAL = ['Data', 'Hora', 'Responsável', 'T Atual (°C)', 'T Máx (°C)', 'T Mín (°C)', 'Observação']
+COLUNAS_PLANILHA_TERMOMETRO = [
+    'Data', 'Hora', 'Responsável', 'Temperatura Atual (ºC)', 'Temperatura Máxima (ºC)',
+    'Temperatura Mínima (ºC)', 'Observação'
+]
+
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _nome_aba(nome, usados):
+    """Nome de aba válido e único (Excel limita a 31 caracteres e proíbe []:*?/\\)."""
+    base = re.sub(r'[\[\]:*?/\\]', '-', nome)[:31] or 'Termometro'
+    candidato, n = base, 2
+    while candidato.lower() in usados:
+        sufixo = f' ({n})'
+        candidato = base[:31 - len(sufixo)] + sufixo
+        n += 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def _data_e_hora_sp(datas):
+    """Formata em bloco as datas UTC de um lote como ('dd/mm/aaaa', 'HH:MM') de SP."""
+    validas = [d for d in datas if d is not None]
+    if not validas:
+        return [(None, None)] * len(datas)
+    datas_sp = converter_para_sp(validas)
+    formatadas = iter(zip(datas_sp.strftime('%d/%m/%Y'), datas_sp.strftime('%H:%M')))
+    return [next(formatadas) if d is not None else (None, None) for d in datas]
+
+
+def _escrever_arquivadas(aba, linha, termometro_id):
+    """Escreve as leituras dos anos arquivados do termômetro (um ano por vez). Retorna a próxima linha."""
+    for ano in anos_arquivados(termometro_id):
+        df = ler_arquivo(termometro_id, ano).sort_values('id')
+        # Leitura que ainda está na tabela (arquivamento interrompido) sai só pela consulta normal
+        na_tabela = set(db.session.query(Verificacao.id, Verificacao.data_hora).filter(
+            Verificacao.termometro_id == termometro_id, Verificacao.mes_sp.like(f'{ano}-%')))
+        if na_tabela:
+            df = df[[chave not in na_tabela for chave in zip(df['id'], df['data_hora'].dt.to_pydatetime())]]
+        df = df.astype(object).where(df.notna(), None)
+        datas_sp = _data_e_hora_sp([d.to_pydatetime() if d is not None else None for d in df['data_hora']])
+        colunas = zip(df['responsavel'], df['temperatura_atual'], df['temperatura_max'],
+                      df['temperatura_min'], df['observacao'])
+        for (responsavel, atual, maxima, minima, observacao), (data, hora) in zip(colunas, datas_sp):
+            aba.write_row(linha, 0, [data, hora, responsavel, atual, maxima, minima, observacao])
+            linha += 1
+    return linha
+
+
+def escrever_planilha_geral(destino, lote=2000):
+    """Grava a planilha com uma aba por termômetro em 'destino' (caminho ou arquivo binário).
+
+    Uma única consulta ordenada (termômetro, leitura) é lida em lotes e escrita
+    linha a linha no modo constant_memory do xlsxwriter: o consumo de memória
+    não depende da quantidade de leituras.
+    """
+    consulta = (
+        select(
+            Termometro.id,
+            Termometro.identificacao,
+            Verificacao.data_hora,
+            Verificacao.responsavel,
+            Verificacao.temperatura_atual,
+            Verificacao.temperatura_max,
+            Verificacao.temperatura_min,
+            Verificacao.observacao
+        )
+        .outerjoin(Verificacao, Verificacao.termometro_id == Termometro.id)
+        .order_by(Termometro.id, Verificacao.id)
+        .execution_options(yield_per=lote)
+    )
+
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    try:
+        abas_usadas = set()
+        termometro_atual = None
+        aba = None
+        linha = 0
+
+        # Lotes de linhas: o fuso de SP é convertido de uma vez por lote
+        for parte in db.session.execute(consulta).partitions(lote):
+            datas_sp = _data_e_hora_sp([registro.data_hora for registro in parte])
+            for (termometro_id, identificacao, data_hora, responsavel,
+                 atual, maxima, minima, observacao), (data, hora) in zip(parte, datas_sp):
+                if termometro_id != termometro_atual:
+                    termometro_atual = termometro_id
+                    nome = identificacao or f"Termometro_{termometro_id}"
+                    aba = workbook.add_worksheet(_nome_aba(nome, abas_usadas))
+                    aba.write_row(0, 0, COLUNAS_PLANILHA_GERAL)
+                    # Anos arquivados vêm antes (são os mais antigos)
+                    linha = _escrever_arquivadas(aba, 1, termometro_id)
+
+                # Termômetro sem leituras (linha do LEFT JOIN): só o cabeçalho
+                if data_hora is None:
+                    continue
+
+                aba.write_row(linha, 0, [data, hora, responsavel, atual, maxima, minima, observacao])
+                linha += 1
+    finally:
+        workbook.close()
+
+
+def escrever_planilha_termometro(destino, termometro_id, lote=2000):
+    """Grava a planilha de um termômetro (aba única 'Verificações') em 'destino', em fluxo."""
+    consulta = (
+        select(
+            Verificacao.data_hora,
+            Verificacao.responsavel,
+            Verificacao.temperatura_atual,
+            Verificacao.temperatura_max,
+            Verificacao.temperatura_min,
+            Verificacao.observacao
+        )
+        .where(Verificacao.termometro_id == termometro_id)
+        .order_by(Verificacao.id)
+        .execution_options(yield_per=lote)
+    )
+
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    try:
+        aba = workbook.add_worksheet('Verificações')
+        aba.write_row(0, 0, COLUNAS_PLANILHA_TERMOMETRO)
+        linha = _escrever_arquivadas(aba, 1, termometro_id)
+        for parte in db.session.execute(consulta).partitions(lote):
+            datas_sp = _data_e_hora_sp([registro.data_hora for registro in parte])
+            for (_, responsavel, atual, maxima, minima, observacao), (data, hora) in zip(parte, datas_sp):
+                aba.write_row(linha, 0, [data, hora, responsavel, atual, maxima, minima, observacao])
+                linha += 1
+    finally:
+        workbook.close()
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import json
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import Termometro, Verificacao, LoteIngestao
+from .status_diario import regravar_status_diario
+from .estatistica import reconstruir_estatisticas
+from .tempo import SP_TZ
+
+# Colunas aceitas no CSV/JSON dos data loggers
+COLUNAS_OBRIGATORIAS = ['identificacao', 'data_hora', 'temperatura_atual']
+COLUNAS_OPCIONAIS = ['temperatura_max', 'temperatura_min', 'responsavel', 'observacao']
+COLUNAS_TEMPERATURA = ['temperatura_atual', 'temperatura_max', 'temperatura_min']
+
+TAMANHO_LOTE_INSERT = 1000
+MAX_ERROS_RELATADOS = 50
+
+
+class LoteInvalido(ValueError):
+    """O lote não passou na validação; 'erros' lista (linha, mensagem)."""
+
+    def __init__(self, erros):
+        super().__init__(f'{len(erros)} erro(s) no lote')
+        self.erros = erros
+
+
+def chave_do_conteudo(conteudo):
+    """Chave padrão do lote: o sha256 do arquivo (reenviar o mesmo arquivo não duplica)."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def ler_lote(conteudo, formato):
+    """Bytes de um CSV ou JSON -> DataFrame com as colunas do lote (tudo como texto)."""
+    import pandas as pd
+
+    if formato == 'json':
+        try:
+            dados = json.loads(conteudo)
+        except ValueError as e:
+            raise LoteInvalido([(None, f'JSON inválido: {e}')])
+        if isinstance(dados, dict):
+            dados = dados.get('leituras', [])
+        if not isinstance(dados, list):
+            raise LoteInvalido([(None, 'O JSON deve ser uma lista de leituras ou {"leituras": [...]}')])
+        df = pd.DataFrame.from_records(dados)
+    else:
+        texto = conteudo.decode('utf-8-sig')
+        primeira_linha = texto.split('\n', 1)[0]
+        separador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+        df = pd.read_csv(io.StringIO(texto), sep=separador, dtype=str, keep_default_na=False)
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df
+
+
+def validar_lote(df, responsavel_padrao=None):
+    """Valida o lote inteiro numa passada vetorizada.
+
+    Datas sem fuso são tratadas como horário de SP (é o relógio dos loggers).
+    Retorna o DataFrame pronto para gravar (termometro_id, data_hora em UTC
+    naive, data_sp, mes_sp, temperaturas...) ou levanta LoteInvalido.
+    """
+    import pandas as pd
+
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in df.columns]
+    if faltando:
+        raise LoteInvalido([(None, f'Colunas obrigatórias ausentes: {", ".join(faltando)}')])
+    if df.empty:
+        raise LoteInvalido([(None, 'O lote não tem leituras')])
+
+    for coluna in COLUNAS_OPCIONAIS:
+        if coluna not in df.columns:
+            df[coluna] = None
+
+    # Linha como o usuário vê no arquivo (cabeçalho = linha 1)
+    linhas = pd.Series(df.index + 2, index=df.index)
+    problemas = []
+
+    # Termômetros: um único SELECT para todas as identificações do lote
+    identificacoes = df['identificacao'].astype(str).str.strip()
+    mapa = dict(
+        db.session.query(Termometro.identificacao, Termometro.id)
+        .filter(Termometro.identificacao.in_(identificacoes.unique().tolist()))
+    )
+    termometro_id = identificacoes.map(mapa)
+    problemas.append((termometro_id.isna(), 'termômetro desconhecido'))
+
+    # Datas: com fuso -> UTC; sem fuso -> horário de SP -> UTC
+    datas = df['data_hora'].astype(str).str.strip()
+    com_fuso = datas.str.contains(r'(?:Z|[+-]\d{2}:?\d{2})$', regex=True)
+    data_utc = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if com_fuso.any():
+        convertidas = pd.to_datetime(datas[com_fuso], errors='coerce', utc=True, format='ISO8601')
+        data_utc[com_fuso] = convertidas.dt.tz_localize(None)
+    if (~com_fuso).any():
+        locais = pd.to_datetime(datas[~com_fuso], errors='coerce', dayfirst=_dia_primeiro(datas[~com_fuso]),
+                                format='mixed')
+        locais = locais.dt.tz_localize(SP_TZ.zone, ambiguous='NaT', nonexistent='shift_forward')
+        data_utc[~com_fuso] = locais.dt.tz_convert('UTC').dt.tz_localize(None)
+    problemas.append((data_utc.isna(), 'data_hora inválida'))
+    problemas.append((data_utc > pd.Timestamp(datetime.utcnow()), 'data_hora no futuro'))
+
+    temperaturas = {}
+    for coluna in COLUNAS_TEMPERATURA:
+        bruto = df[coluna].replace({'': None})
+        if not pd.api.types.is_numeric_dtype(bruto):
+            bruto = bruto.astype('string').str.replace(',', '.', regex=False)
+        valores = pd.to_numeric(bruto, errors='coerce')
+        invalido = valores.isna() & bruto.notna()
+        if coluna == 'temperatura_atual':
+            invalido |= bruto.isna()
+        problemas.append((invalido, f'{coluna} inválida'))
+        temperaturas[coluna] = valores
+
+    chave_leitura = pd.DataFrame({'t': termometro_id, 'd': data_utc})
+    problemas.append((chave_leitura.duplicated(keep='first') & termometro_id.notna() & data_utc.notna(),
+                      'leitura repetida no lote (mesmo termômetro e data_hora)'))
+
+    erros = []
+    for mascara, mensagem in problemas:
+        erros += [(int(linha), mensagem) for linha in linhas[mascara.fillna(False)]]
+    if erros:
+        raise LoteInvalido(sorted(erros, key=lambda e: e[0])[:MAX_ERROS_RELATADOS])
+
+    data_local = data_utc.dt.tz_localize('UTC').dt.tz_convert(SP_TZ.zone)
+    responsavel = df['responsavel'].replace({'': None})
+    if responsavel_padrao:
+        responsavel = responsavel.fillna(responsavel_padrao)
+
+    return pd.DataFrame({
+        'termometro_id': termometro_id.astype(int),
+        'data_hora': data_utc,
+        'data_sp': data_local.dt.date,
+        'mes_sp': data_local.dt.strftime('%Y-%m'),
+        **temperaturas,
+        'responsavel': responsavel,
+        'observacao': df['observacao'].replace({'': None}),
+    })
+
+
+def _dia_primeiro(datas):
+    """Datas locais no formato brasileiro (31/12/2025) vêm com barra e o dia primeiro."""
+    return bool(datas.str.contains('/', regex=False).any())
+
+
+def importar_lote(conteudo, formato='csv', chave=None, origem=None, arquivo=None, lote=TAMANHO_LOTE_INSERT):
+    """Valida e grava um lote de leituras numa única transação. Faz commit.
+
+    Retorna (LoteIngestao, novo): 'novo' é False quando a chave já tinha sido
+    importada, e nesse caso nada é gravado. Levanta LoteInvalido se a
+    validação falhar (nenhuma leitura é gravada).
+    """
+    chave = chave or chave_do_conteudo(conteudo)
+    existente = LoteIngestao.query.filter_by(chave=chave).first()
+    if existente is not None:
+        return existente, False
+
+    leituras = validar_lote(ler_lote(conteudo, formato), responsavel_padrao=origem)
+
+    registro = LoteIngestao(chave=chave, origem=origem, arquivo=arquivo, qtd_leituras=len(leituras))
+    db.session.add(registro)
+    try:
+        # A chave única é gravada primeiro: um envio simultâneo do mesmo lote falha aqui
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return LoteIngestao.query.filter_by(chave=chave).one(), False
+
+    agora = datetime.utcnow()
+    registros = leituras.astype(object).where(leituras.notna(), None).to_dict('records')
+    for inicio in range(0, len(registros), lote):
+        bloco = registros[inicio:inicio + lote]
+        for r in bloco:
+            r['data_hora'] = r['data_hora'].to_pydatetime()
+            r['atualizado_em'] = agora
+        # executemany: o INSERT do Core não passa pelo evento preencher_data_local,
+        # por isso data_sp/mes_sp já vêm calculados pelo validar_lote
+        db.session.execute(Verificacao.__table__.insert(), bloco)
+
+    termometro_ids = sorted(leituras['termometro_id'].unique().tolist())
+    regravar_status_diario(
+        inicio=leituras['data_sp'].min(),
+        fim=leituras['data_sp'].max(),
+        termometro_ids=termometro_ids
+    )
+    reconstruir_estatisticas(termometro_ids=termometro_ids, meses=sorted(leituras['mes_sp'].unique().tolist()))
+    db.session.commit()
+    return registro, True
@@ -0,0 +1,79 @@
+import os
+
+# Configuração por ambiente. O ambiente é escolhido pela variável APP_AMBIENTE
+# (desenvolvimento, producao ou teste); APP_CONFIG pode apontar para um .py
+# com sobrescritas locais (ex.: SECRET_KEY, URL_BASE).
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'sua-chave-secreta')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///temperatura.db')
+
+    # PRAGMAs aplicados em toda conexão SQLite do pool (ver app/banco.py).
+    # WAL deixa leituras e a escrita andarem juntas; busy_timeout faz a conexão
+    # esperar pelo lock em vez de falhar com "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 30000,   # ms
+        'synchronous': 'NORMAL', # seguro com WAL e bem mais rápido que FULL
+        'cache_size': -20000,    # ~20 MB de cache de páginas por conexão
+    }
+
+    # Endereço gravado nos QR codes gerados fora de uma requisição (flask etiquetas gerar)
+    URL_BASE = os.environ.get('URL_BASE')
+
+    # Ingestão em massa: {token: nome da origem} aceitos em Authorization: Bearer
+    INGESTAO_TOKENS = {}
+
+    # API JSON somente leitura (/api/v1): {token: nome} para integrações (LIMS, painéis)
+    API_TOKENS = {}
+
+    # Limite de tentativas de login: (capacidade, segundos para repor uma tentativa).
+    # Com vários workers, aponte LIMITE_LOGIN_REDIS_URL para um Redis compartilhado.
+    LIMITE_LOGIN_USUARIO = (5, 60.0)
+    LIMITE_LOGIN_IP = (20, 6.0)
+    LIMITE_LOGIN_REDIS_URL = os.environ.get('LIMITE_LOGIN_REDIS_URL')
+
+    # /metrics (formato Prometheus): {token: nome} aceitos além da sessão logada
+    METRICAS_TOKENS = {}
+    # Cabeçalhos X-Consultas-SQL / X-Tempo-SQL-ms em cada resposta (depuração)
+    METRICAS_CABECALHO_SQL = False
+
+    # Exportações em segundo plano
+    EXPORTACAO_WORKERS = 2
+    EXPORTACAO_RETENCAO_HORAS = 24
+
+    # Relatórios PDF (WeasyPrint): processos que convertem o HTML em paralelo
+    RELATORIO_WORKERS = 2
+
+    # Eventos do painel (SSE em /eventos/status): com Redis, valem entre workers
+    EVENTOS_REDIS_URL = os.environ.get('EVENTOS_REDIS_URL')
+    EVENTOS_DURACAO_MAXIMA = 300  # segundos por conexão; o navegador reconecta
+    EVENTOS_PING_SEGUNDOS = 15
+
+    # Arquivo frio (flask arquivo arquivar): anos que continuam no SQLite,
+    # contando o corrente; os anteriores vão para instance/arquivo/*.parquet
+    ARQUIVO_ANOS_QUENTES = 2
+
+
+class DesenvolvimentoConfig(Config):
+    DEBUG = True
+    METRICAS_CABECALHO_SQL = True
+
+
+class ProducaoConfig(Config):
+    DEBUG = False
+    EXPORTACAO_WORKERS = 4
+
+
+class TesteConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+AMBIENTES = {
+    'desenvolvimento': DesenvolvimentoConfig,
+    'producao': ProducaoConfig,
+    'teste': TesteConfig,
+}
@@ -0,0 +1,108 @@
+import math
+import time
+from threading import Lock
+from flask import current_app
+from .cache import LRUCache
+
+# Limites padrão: (capacidade do balde, segundos para repor uma ficha)
+LIMITE_USUARIO_PADRAO = (5, 60.0)   # 5 tentativas seguidas, depois 1 por minuto
+LIMITE_IP_PADRAO = (20, 6.0)        # um tablet compartilhado faz mais tentativas
+
+
+class MemoriaStore:
+    """Baldes de fichas em memória (um processo). Limitado em quantidade de chaves."""
+
+    def __init__(self, maxsize=10000):
+        self._baldes = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+
+    def consumir(self, chave, capacidade, intervalo):
+        """Tenta tirar uma ficha do balde. Retorna (permitido, segundos até a próxima ficha)."""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado = self._baldes.get(chave, (capacidade, agora))
+            fichas = min(capacidade, fichas + (agora - atualizado) / intervalo)
+            permitido = fichas >= 1
+            if permitido:
+                fichas -= 1
+            self._baldes.set(chave, (fichas, agora))
+        return permitido, 0.0 if permitido else (1 - fichas) * intervalo
+
+    def limpar(self, chave):
+        self._baldes.pop(chave)
+
+
+class RedisStore:
+    """Baldes de fichas no Redis, compartilhados entre os workers (gunicorn, várias máquinas)."""
+
+    # Leitura, reposição e consumo atômicos num único script
+    SCRIPT = """
+    local capacidade = tonumber(ARGV[1])
+    local intervalo = tonumber(ARGV[2])
+    local agora = tonumber(ARGV[3])
+    local estado = redis.call('HMGET', KEYS[1], 'fichas', 'ts')
+    local fichas = tonumber(estado[1]) or capacidade
+    local ts = tonumber(estado[2]) or agora
+    fichas = math.min(capacidade, fichas + math.max(0, agora - ts) / intervalo)
+    local permitido = 0
+    if fichas >= 1 then
+        fichas = fichas - 1
+        permitido = 1
+    end
+    redis.call('HSET', KEYS[1], 'fichas', tostring(fichas), 'ts', tostring(agora))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacidade * intervalo))
+    return {permitido, tostring(fichas)}
+    """
+
+    def __init__(self, url, prefixo='limite-login:'):
+        import redis  # dependência opcional: só é necessária com LIMITE_LOGIN_REDIS_URL
+
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+        self._prefixo = prefixo
+
+    def consumir(self, chave, capacidade, intervalo):
+        permitido, fichas = self._script(keys=[self._prefixo + chave], args=[capacidade, intervalo, time.time()])
+        permitido = bool(int(permitido))
+        return permitido, 0.0 if permitido else (1 - float(fichas)) * intervalo
+
+    def limpar(self, chave):
+        self._redis.delete(self._prefixo + chave)
+
+
+class LimitadorLogin:
+    """Limita as tentativas de login por usuário e por IP, antes de qualquer hash de senha."""
+
+    def __init__(self, store, limite_usuario=LIMITE_USUARIO_PADRAO, limite_ip=LIMITE_IP_PADRAO):
+        self.store = store
+        self.limite_usuario = limite_usuario
+        self.limite_ip = limite_ip
+
+    def tentar(self, username, ip):
+        """Consome uma tentativa. Retorna None se liberado ou os segundos a esperar."""
+        permitido, espera = self.store.consumir(f'ip:{ip}', *self.limite_ip)
+        if not permitido:
+            return math.ceil(espera)
+        permitido, espera = self.store.consumir(f'usuario:{(username or "").strip().lower()}', *self.limite_usuario)
+        if not permitido:
+            return math.ceil(espera)
+        return None
+
+    def sucesso(self, username):
+        """Login correto: o usuário recupera todas as tentativas (o balde do IP continua)."""
+        self.store.limpar(f'usuario:{(username or "").strip().lower()}')
+
+
+def obter_limitador():
+    """Limitador do app, criado na primeira chamada conforme a configuração."""
+    limitador = current_app.extensions.get('limitador_login')
+    if limitador is None:
+        url_redis = current_app.config.get('LIMITE_LOGIN_REDIS_URL')
+        store = RedisStore(url_redis) if url_redis else MemoriaStore()
+        limitador = LimitadorLogin(
+            store,
+            limite_usuario=current_app.config.get('LIMITE_LOGIN_USUARIO', LIMITE_USUARIO_PADRAO),
+            limite_ip=current_app.config.get('LIMITE_LOGIN_IP', LIMITE_IP_PADRAO),
+        )
+        current_app.extensions['limitador_login'] = limitador
+    return limitador
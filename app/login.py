@@ -2,15 +2,23 @@ from flask import render_template, request, redirect, url_for, flash, session
 from . import bp  # Importe o Blueprint corretamente
 from .models import Usuario
 from .forms import LoginForm
+from .limitador import obter_limitador
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     form = LoginForm()
 
     if form.validate_on_submit():
+        limitador = obter_limitador()
+        espera = limitador.tentar(form.username.data, request.remote_addr)
+        if espera is not None:
+            flash(f'Muitas tentativas de login. Tente novamente em {espera} segundo(s).', 'danger')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(espera)}
+
         usuario = Usuario.query.filter_by(username=form.username.data).first()
 
         if usuario and usuario.check_senha(form.senha.data):
+            limitador.sucesso(usuario.username)
             session['usuario_id'] = usuario.id  # Armazena o ID do usuário na sessão
             session['usuario_nome'] = usuario.username  # Armazena o nome do usuário na sessão
             flash('Login bem-sucedido!', 'success')
@@ -0,0 +1,167 @@
+import time
+from threading import Lock
+from flask import g, request, has_request_context, Response, current_app
+from sqlalchemy import event
+from .tokens import origem_da_requisicao
+
+# Métricas por endpoint, em memória (cada processo expõe as suas em /metrics)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+MIMETYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # o último é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        else:
+            self.contagens[-1] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip(list(self.buckets) + ['+Inf'], self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{_rotulos(rotulos, le=limite)} {acumulado}'
+        yield f'{nome}_sum{_rotulos(rotulos)} {self.soma}'
+        yield f'{nome}_count{_rotulos(rotulos)} {self.total}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(rotulos, **extras):
+    itens = list(rotulos.items()) + list(extras.items())
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in itens) + '}'
+
+
+class Registro:
+    """Acumula latência, quantidade e tempo de SQL por endpoint (seguro entre threads)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.latencia = {}
+        self.consultas = {}
+        self.tempo_sql = {}
+        self.requisicoes = {}
+
+    def registrar(self, endpoint, metodo, status, segundos, consultas, segundos_sql):
+        with self._lock:
+            self.latencia.setdefault(endpoint, Histograma(BUCKETS_LATENCIA)).observar(segundos)
+            self.consultas.setdefault(endpoint, Histograma(BUCKETS_CONSULTAS)).observar(consultas)
+            self.tempo_sql[endpoint] = self.tempo_sql.get(endpoint, 0.0) + segundos_sql
+            chave = (endpoint, metodo, status)
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            self.latencia.clear()
+            self.consultas.clear()
+            self.tempo_sql.clear()
+            self.requisicoes.clear()
+
+    def texto_prometheus(self):
+        with self._lock:
+            linhas = [
+                '# HELP gmm_requisicoes_total Requisições atendidas por endpoint, método e status.',
+                '# TYPE gmm_requisicoes_total counter',
+            ]
+            for (endpoint, metodo, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f'gmm_requisicoes_total{_rotulos({"endpoint": endpoint, "metodo": metodo, "status": status})} {total}')
+
+            linhas += [
+                '# HELP gmm_requisicao_segundos Latência das requisições por endpoint.',
+                '# TYPE gmm_requisicao_segundos histogram',
+            ]
+            for endpoint, histograma in sorted(self.latencia.items()):
+                linhas += histograma.linhas('gmm_requisicao_segundos', {'endpoint': endpoint})
+
+            linhas += [
+                '# HELP gmm_sql_consultas Instruções SQL executadas por requisição.',
+                '# TYPE gmm_sql_consultas histogram',
+            ]
+            for endpoint, histograma in sorted(self.consultas.items()):
+                linhas += histograma.linhas('gmm_sql_consultas', {'endpoint': endpoint})
+
+            linhas += [
+                '# HELP gmm_sql_segundos_total Tempo gasto em SQL por endpoint.',
+                '# TYPE gmm_sql_segundos_total counter',
+            ]
+            for endpoint, segundos in sorted(self.tempo_sql.items()):
+                linhas.append(f'gmm_sql_segundos_total{_rotulos({"endpoint": endpoint})} {segundos}')
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+
+# =========================
+# Eventos do SQLAlchemy
+# =========================
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metricas_inicio' in g:
+        conn.info.setdefault('metricas_inicio_sql', []).append(time.perf_counter())
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('metricas_inicio_sql')
+    if not inicios or not has_request_context() or 'metricas_inicio' not in g:
+        return
+    g.metricas_sql += 1
+    g.metricas_sql_segundos += time.perf_counter() - inicios.pop()
+
+
+def _erro_sql(contexto):
+    inicios = contexto.connection.info.get('metricas_inicio_sql') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+# =========================
+# Ciclo da requisição
+# =========================
+def _iniciar():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql = 0
+    g.metricas_sql_segundos = 0.0
+
+
+def _finalizar(resposta):
+    if 'metricas_inicio' not in g:
+        return resposta
+    segundos = time.perf_counter() - g.metricas_inicio
+    registro.registrar(request.endpoint or 'desconhecido', request.method, resposta.status_code,
+                       segundos, g.metricas_sql, g.metricas_sql_segundos)
+    if current_app.config.get('METRICAS_CABECALHO_SQL'):
+        resposta.headers['X-Consultas-SQL'] = str(g.metricas_sql)
+        resposta.headers['X-Tempo-SQL-ms'] = f'{g.metricas_sql_segundos * 1000:.2f}'
+    return resposta
+
+
+def metricas():
+    if origem_da_requisicao('METRICAS_TOKENS') is None:
+        return Response('Não autenticado.\n', status=401, mimetype='text/plain')
+    return Response(registro.texto_prometheus(), content_type=MIMETYPE_PROMETHEUS)
+
+
+def configurar_metricas(app, engine, blueprints):
+    """Liga a coleta nos blueprints informados, no engine do banco e expõe /metrics."""
+    event.listen(engine, 'before_cursor_execute', _antes_sql)
+    event.listen(engine, 'after_cursor_execute', _depois_sql)
+    event.listen(engine, 'handle_error', _erro_sql)
+    # Registrado no app (e não no objeto Blueprint, que é global): vale só para este app
+    for blueprint in blueprints:
+        app.before_request_funcs.setdefault(blueprint.name, []).append(_iniciar)
+        app.after_request_funcs.setdefault(blueprint.name, []).append(_finalizar)
+    app.add_url_rule('/metrics', 'metricas', metricas)
@@ -1,9 +1,10 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
 from wtforms.validators import DataRequired
-import pytz
 from datetime import datetime
+from sqlalchemy import event
 from . import db
+from .tempo import para_sp, dia_sp, mes_sp
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -20,14 +21,43 @@ class Usuario(db.Model):
         return check_password_hash(self.senha_hash, senha)
 
 
+class Setor(db.Model):
+    """Setor dos termômetros, com contagens desnormalizadas (mantidas por app/setores.py).
+
+    qtd_atrasados/qtd_incompletos valem para o dia 'dia' (local de SP); num
+    dia mais novo, sem gravação ainda, todos estão atrasados (ver contagens_de_hoje).
+    """
+    __tablename__ = 'setor'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    qtd_termometros = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    qtd_atrasados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    qtd_incompletos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dia = db.Column(db.Date)
+
+    termometros = db.relationship('Termometro', back_populates='setor', lazy=True)
+
+    def __str__(self):
+        return self.nome
+
+    def __repr__(self):
+        return f'<Setor {self.nome}>'
+
+
 class Termometro(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    setor = db.Column(db.String(100))
+    setor_id = db.Column(db.Integer, db.ForeignKey('setor.id'), index=True)
     equipamento = db.Column(db.String(100))
     especificacao = db.Column(db.String(100))
     identificacao = db.Column(db.String(50))
     padrao_identificacao = db.Column(db.String(50))
+    # Distingue termômetros que o SQLite criou com o mesmo id (entra nas chaves de cache e ETags)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
+    # Nos templates {{ termometro.setor }} mostra o nome (Setor.__str__)
+    setor = db.relationship('Setor', back_populates='termometros')
+
     # Define o relacionamento com as verificações
     verificacoes = db.relationship('Verificacao', backref='termometro', lazy=True)
 
@@ -40,19 +70,144 @@ class Verificacao(db.Model):
     responsavel = db.Column(db.String(100))
     observacao = db.Column(db.String(100))
     termometro_id = db.Column(db.Integer, db.ForeignKey('termometro.id'))
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Dia e mês locais de SP, gravados junto com a leitura (ver preencher_data_local)
+    data_sp = db.Column(db.Date)
+    mes_sp = db.Column(db.String(7))  # 'AAAA-MM'
+
+    # Índices usados pelas consultas "leituras do termômetro X no período/dia/mês Y"
+    __table_args__ = (
+        db.Index('ix_verificacao_termometro_id_data_hora', 'termometro_id', 'data_hora'),
+        db.Index('ix_verificacao_termometro_id_data_sp', 'termometro_id', 'data_sp'),
+        db.Index('ix_verificacao_termometro_id_mes_sp', 'termometro_id', 'mes_sp'),
+    )
 
     def get_data_hora_sp(self):
         """Converte data_hora (UTC naive) para horário de São Paulo."""
-        # 1) localiza em UTC
-        utc = pytz.utc.localize(self.data_hora)
-        # 2) converte para SP
-        sp_tz = pytz.timezone('America/Sao_Paulo')
-        sp_time = utc.astimezone(sp_tz)
-        return sp_time
+        return para_sp(self.data_hora)
 
     def __repr__(self):
         return f'<Verificacao {self.id}>'
-    
-    
 
 
+@event.listens_for(Verificacao, 'before_insert')
+@event.listens_for(Verificacao, 'before_update')
+def preencher_data_local(mapper, connection, verificacao):
+    """Mantém data_sp/mes_sp coerentes com data_hora em toda gravação pelo ORM."""
+    if verificacao.data_hora is None:
+        verificacao.data_hora = datetime.utcnow()
+    data = dia_sp(verificacao.data_hora)
+    verificacao.data_sp = data
+    verificacao.mes_sp = mes_sp(data)
+
+
+class StatusDiario(db.Model):
+    """Situação de um termômetro num dia local de SP (mantida a cada gravação de leitura)."""
+    __tablename__ = 'status_diario'
+
+    id = db.Column(db.Integer, primary_key=True)
+    termometro_id = db.Column(db.Integer, db.ForeignKey('termometro.id'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    qtd_leituras = db.Column(db.Integer, nullable=False, default=0)
+    completo = db.Column(db.Boolean, nullable=False, default=False)  # alguma leitura com máx/mín
+
+    __table_args__ = (
+        db.UniqueConstraint('termometro_id', 'data', name='uq_status_diario_termometro_data'),
+        db.Index('ix_status_diario_data', 'data'),
+    )
+
+    def __repr__(self):
+        return f'<StatusDiario {self.termometro_id} {self.data}>'
+
+
+class TarefaExportacao(db.Model):
+    """Exportação pesada executada em segundo plano (ver app/tarefas.py)."""
+    __tablename__ = 'tarefa_exportacao'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 em hexadecimal
+    tipo = db.Column(db.String(30), nullable=False)  # 'planilha_geral' ou 'termometro'
+    termometro_id = db.Column(db.Integer, db.ForeignKey('termometro.id', ondelete='SET NULL'))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='SET NULL'))
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente/executando/concluida/erro
+    arquivo = db.Column(db.String(255))  # nome do arquivo na pasta de exportações
+    nome_download = db.Column(db.String(100))
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    concluido_em = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<TarefaExportacao {self.id} {self.status}>'
+
+
+class LoteIngestao(db.Model):
+    """Lote de leituras importado em massa (ver app/ingestao.py).
+
+    A chave única torna a importação idempotente: reenviar o mesmo arquivo
+    (ou a mesma Idempotency-Key) não grava as leituras de novo.
+    """
+    __tablename__ = 'lote_ingestao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(64), unique=True, nullable=False)
+    origem = db.Column(db.String(100))  # usuário, token ou 'cli'
+    arquivo = db.Column(db.String(255))
+    qtd_leituras = db.Column(db.Integer, nullable=False, default=0)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LoteIngestao {self.chave}>'
+
+
+class ViolacaoControle(db.Model):
+    """Leitura que quebrou uma regra da carta controle (ver app/controle.py)."""
+    __tablename__ = 'violacao_controle'
+
+    id = db.Column(db.Integer, primary_key=True)
+    termometro_id = db.Column(db.Integer, db.ForeignKey('termometro.id'), nullable=False)
+    verificacao_id = db.Column(db.Integer, db.ForeignKey('verificacao.id'), nullable=False)
+    regra = db.Column(db.String(30), nullable=False)  # chave de controle.REGRAS
+    mes_sp = db.Column(db.String(7), nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+    media = db.Column(db.Float, nullable=False)  # estatística do mês no momento da avaliação
+    desvio = db.Column(db.Float, nullable=False)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    termometro = db.relationship('Termometro')
+    verificacao = db.relationship('Verificacao')
+
+    __table_args__ = (
+        db.UniqueConstraint('verificacao_id', 'regra', name='uq_violacao_controle_verificacao_regra'),
+        db.Index('ix_violacao_controle_termometro_id_mes_sp', 'termometro_id', 'mes_sp'),
+    )
+
+    def __repr__(self):
+        return f'<ViolacaoControle {self.regra} {self.verificacao_id}>'
+
+
+class EstatisticaMensal(db.Model):
+    """Estatística corrente de um termômetro num mês local de SP (ver app/estatistica.py).
+
+    Mantida a cada inclusão, edição e exclusão de leitura pelo algoritmo de
+    Welford (média e M2), sem reler as leituras do mês. 'versao' aumenta a
+    cada alteração do mês e serve de chave para caches e ETags.
+    """
+    __tablename__ = 'estatistica_mensal'
+
+    id = db.Column(db.Integer, primary_key=True)
+    termometro_id = db.Column(db.Integer, db.ForeignKey('termometro.id'), nullable=False)
+    mes_sp = db.Column(db.String(7), nullable=False)  # 'AAAA-MM'
+    qtd_leituras = db.Column(db.Integer, nullable=False, default=0)  # todas as leituras do mês
+    n = db.Column(db.Integer, nullable=False, default=0)  # leituras com temperatura_atual
+    media = db.Column(db.Float, nullable=False, default=0.0)
+    m2 = db.Column(db.Float, nullable=False, default=0.0)  # soma dos quadrados dos desvios
+    minimo = db.Column(db.Float)
+    maximo = db.Column(db.Float)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        db.UniqueConstraint('termometro_id', 'mes_sp', name='uq_estatistica_mensal_termometro_mes'),
+    )
+
+    def __repr__(self):
+        return f'<EstatisticaMensal {self.termometro_id} {self.mes_sp}>'
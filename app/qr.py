@@ -0,0 +1,55 @@
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+import qrcode
+from flask import current_app
+from .cache import LRUCache
+
+# Opções de renderização (as mesmas de qrcode.make())
+OPCOES_PADRAO = {'box_size': 10, 'border': 4}
+
+# PNGs mais usados ficam na memória; os demais no cache em disco (endereçado pelo conteúdo)
+_cache_memoria = LRUCache(maxsize=512)
+
+
+def chave_qr(url, **opcoes):
+    """Hash que identifica o PNG: a URL codificada + opções de renderização."""
+    dados = json.dumps({'url': url, **OPCOES_PADRAO, **opcoes}, sort_keys=True)
+    return hashlib.sha256(dados.encode()).hexdigest()
+
+
+def renderizar_png(url, **opcoes):
+    """Gera o PNG do QR code (função pura, sem cache)."""
+    img = qrcode.make(url, **{**OPCOES_PADRAO, **opcoes})
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def pasta_cache_qr():
+    return Path(current_app.instance_path) / 'qr_cache'
+
+
+def obter_png(url, **opcoes):
+    """Retorna (chave, png), buscando na memória, depois no disco e só então renderizando."""
+    chave = chave_qr(url, **opcoes)
+
+    png = _cache_memoria.get(chave)
+    if png is not None:
+        return chave, png
+
+    caminho = pasta_cache_qr() / chave[:2] / f'{chave}.png'
+    if caminho.exists():
+        png = caminho.read_bytes()
+    else:
+        png = renderizar_png(url, **opcoes)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Grava em arquivo temporário e renomeia: outro worker nunca lê um PNG pela metade
+        temporario = caminho.with_suffix(f'.{os.getpid()}.tmp')
+        temporario.write_bytes(png)
+        os.replace(temporario, caminho)
+
+    _cache_memoria.set(chave, png)
+    return chave, png
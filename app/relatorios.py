@@ -0,0 +1,238 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from threading import Lock
+from flask import current_app, render_template
+from werkzeug.utils import secure_filename
+from . import db
+from .arquivo import leituras_do_mes
+from .estatistica import desvio_padrao, obter
+from .models import EstatisticaMensal, Setor, Termometro
+from .tempo import rotulo_mes
+
+# PDFs da carta controle mensal (um termômetro ou um setor inteiro).
+# O HTML é montado no processo do Flask (precisa do banco); a conversão pelo
+# WeasyPrint, que é pesada em CPU, roda num pool de processos. Cada PDF é
+# gravado em instance/relatorios com um nome derivado da versão do mês
+# (estatistica_mensal) e dos dados do termômetro: qualquer alteração de
+# leitura gera outro nome, e o arquivo antigo é apagado na próxima geração.
+WORKERS_PADRAO = 2
+LINHAS_MINIMAS = 10  # a folha impressa tem pelo menos 10 linhas, como no histórico
+
+_executor = None
+_executor_lock = Lock()
+
+
+class PdfIndisponivel(RuntimeError):
+    """WeasyPrint (ou as bibliotecas do sistema que ele usa) não está instalado."""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('RELATORIO_WORKERS', WORKERS_PADRAO)
+            # spawn: o servidor tem threads e conexões abertas, que não devem ser copiadas por fork
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def _descartar_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def pasta_relatorios():
+    pasta = Path(current_app.instance_path) / 'relatorios'
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+
+def _html_para_pdf(html, destino):
+    """Executado nos processos do pool: converte o HTML e grava o PDF (troca atômica)."""
+    from weasyprint import HTML  # dependência pesada (pango/cairo): só nos processos do pool
+
+    destino = Path(destino)
+    temporario = destino.with_name(f'.{destino.name}.{os.getpid()}.tmp')
+    HTML(string=html).write_pdf(temporario)
+    os.replace(temporario, destino)
+    return str(destino)
+
+
+# =========================
+# Gráfico (SVG no servidor)
+# =========================
+CORES_LIMITES = [(3, '#dc3545'), (2, '#fd7e14'), (1, '#28a745')]
+
+
+def grafico_svg(valores, media, desvio, largura=900, altura=240):
+    """Carta controle em SVG inline (série do mês, média e ±1/2/3 S), sem JavaScript."""
+    margem_x, margem_y = 48, 14
+    limites = [media + k * desvio for k in (-3, -2, -1, 0, 1, 2, 3)]
+    minimo = min(valores + limites) if valores else media - 1
+    maximo = max(valores + limites) if valores else media + 1
+    if maximo - minimo < 1e-9:
+        minimo, maximo = minimo - 1, maximo + 1
+    folga = (maximo - minimo) * 0.05
+    minimo, maximo = minimo - folga, maximo + folga
+
+    def y(valor):
+        return margem_y + (maximo - valor) / (maximo - minimo) * (altura - 2 * margem_y)
+
+    def x(i):
+        passo = (largura - margem_x - 10) / max(len(valores) - 1, 1)
+        return margem_x + i * passo
+
+    partes = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+              f'viewBox="0 0 {largura} {altura}" font-family="Arial" font-size="9">',
+              f'<rect x="0" y="0" width="{largura}" height="{altura}" fill="white" stroke="#ccc"/>']
+    for k, cor in CORES_LIMITES:
+        for sinal in (-1, 1):
+            valor = media + sinal * k * desvio
+            partes.append(f'<line x1="{margem_x}" x2="{largura - 10}" y1="{y(valor):.1f}" y2="{y(valor):.1f}" '
+                          f'stroke="{cor}" stroke-dasharray="4,3"/>')
+            partes.append(f'<text x="2" y="{y(valor) + 3:.1f}" fill="{cor}">{valor:.2f}</text>')
+    partes.append(f'<line x1="{margem_x}" x2="{largura - 10}" y1="{y(media):.1f}" y2="{y(media):.1f}" stroke="#0047AB"/>')
+    partes.append(f'<text x="2" y="{y(media) + 3:.1f}" fill="#0047AB">{media:.2f}</text>')
+
+    if valores:
+        pontos = ' '.join(f'{x(i):.1f},{y(v):.1f}' for i, v in enumerate(valores))
+        partes.append(f'<polyline points="{pontos}" fill="none" stroke="#333" stroke-width="1.5"/>')
+        for i, v in enumerate(valores):
+            cor = '#dc3545' if desvio and abs(v - media) > 3 * desvio else '#333'
+            partes.append(f'<circle cx="{x(i):.1f}" cy="{y(v):.1f}" r="2.5" fill="{cor}"/>')
+    partes.append('</svg>')
+    return '\n'.join(partes)
+
+
+# =========================
+# Conteúdo e chave de cache
+# =========================
+def _folha(termometro, chave_mes, estatistica):
+    """Dados de uma folha (um termômetro no mês) para o template do relatório."""
+    com_leituras = estatistica is not None and estatistica.qtd_leituras
+    media = estatistica.media if com_leituras else 0.0
+    desvio = desvio_padrao(estatistica.n, estatistica.m2) if com_leituras else 0.0
+    leituras = leituras_do_mes(termometro.id, chave_mes)
+    valores = [v.temperatura_atual for v in leituras if v.temperatura_atual is not None]
+    return {
+        'termometro': termometro,
+        'leituras': leituras,
+        'vazias': max(0, LINHAS_MINIMAS - len(leituras)),
+        'media': media,
+        'desvio': desvio,
+        'grafico': grafico_svg(valores, media, desvio),
+    }
+
+
+def _assinatura(termometros, versoes, chave_mes):
+    """Hash do que aparece no PDF: dados dos termômetros e versão do mês de cada um."""
+    conteudo = [chave_mes] + [
+        [t.id, str(t.setor or ''), t.equipamento, t.especificacao, t.identificacao, versoes.get(t.id, 0)]
+        for t in termometros
+    ]
+    return hashlib.sha1(json.dumps(conteudo).encode()).hexdigest()[:16]
+
+
+def _versoes(termometro_ids, chave_mes):
+    return dict(db.session.query(EstatisticaMensal.termometro_id, EstatisticaMensal.versao).filter(
+        EstatisticaMensal.termometro_id.in_(termometro_ids), EstatisticaMensal.mes_sp == chave_mes))
+
+
+def _trabalho_termometro(termometro, chave_mes):
+    """(prefixo, nome do arquivo, nome do download, função que monta o HTML)."""
+    versoes = _versoes([termometro.id], chave_mes)
+    prefixo = f'termometro-{termometro.id}-{chave_mes}-'
+
+    def montar_html():
+        estatistica = obter(termometro.id, chave_mes)
+        return render_template('relatorio_mes.html', mes=rotulo_mes(chave_mes),
+                               titulo=termometro.identificacao or f'Termômetro {termometro.id}',
+                               folhas=[_folha(termometro, chave_mes, estatistica)])
+
+    download = secure_filename(f'carta_controle_{termometro.identificacao or termometro.id}_{chave_mes}.pdf')
+    return prefixo, prefixo + _assinatura([termometro], versoes, chave_mes) + '.pdf', download, montar_html
+
+
+def _trabalho_setor(setor, chave_mes):
+    termometros = Termometro.query.filter(Termometro.setor_id == setor.id).order_by(Termometro.identificacao).all()
+    versoes = _versoes([t.id for t in termometros], chave_mes)
+    prefixo = f'setor-{setor.id}-{chave_mes}-'
+
+    def montar_html():
+        estatisticas = {
+            linha.termometro_id: linha for linha in EstatisticaMensal.query.filter(
+                EstatisticaMensal.termometro_id.in_([t.id for t in termometros]),
+                EstatisticaMensal.mes_sp == chave_mes)
+        }
+        folhas = [_folha(t, chave_mes, estatisticas.get(t.id)) for t in termometros]
+        return render_template('relatorio_mes.html', mes=rotulo_mes(chave_mes), titulo=f'Setor {setor.nome}', folhas=folhas)
+
+    download = secure_filename(f'carta_controle_setor_{setor.nome}_{chave_mes}.pdf')
+    return prefixo, prefixo + _assinatura(termometros, versoes, chave_mes) + '.pdf', download, montar_html
+
+
+# =========================
+# Geração
+# =========================
+def _gerar(trabalhos):
+    """Converte no pool os PDFs que ainda não estão no cache. Retorna [(caminho, download, gerado)]."""
+    pasta = pasta_relatorios()
+    pendentes = {}
+    for prefixo, nome, _, montar_html in trabalhos:
+        destino = pasta / nome
+        if not destino.exists() and destino not in pendentes:
+            pendentes[destino] = (prefixo, _get_executor().submit(_html_para_pdf, montar_html(), str(destino)))
+
+    for destino, (prefixo, futuro) in pendentes.items():
+        try:
+            futuro.result()
+        except BrokenProcessPool:
+            _descartar_executor()  # um processo morreu: a próxima chamada cria um pool novo
+            raise
+        except (ImportError, OSError) as e:
+            raise PdfIndisponivel(f'Geração de PDF indisponível: {e}') from e
+        # Versões anteriores do mesmo relatório não servem mais
+        for antigo in pasta.glob(f'{prefixo}*.pdf'):
+            if antigo != destino:
+                antigo.unlink(missing_ok=True)
+
+    return [(pasta / nome, download, (pasta / nome) in pendentes) for _, nome, download, _ in trabalhos]
+
+
+def relatorio_termometro(termometro, chave_mes):
+    """(caminho do PDF, nome para download) da carta controle de um termômetro no mês."""
+    caminho, download, _ = _gerar([_trabalho_termometro(termometro, chave_mes)])[0]
+    return caminho, download
+
+
+def relatorio_setor(setor, chave_mes):
+    """(caminho do PDF, nome para download) com as cartas de todos os termômetros do Setor no mês."""
+    caminho, download, _ = _gerar([_trabalho_setor(setor, chave_mes)])[0]
+    return caminho, download
+
+
+def gerar_lote(chave_mes, setores=None, por_setor=False):
+    """Relatórios do mês para vários termômetros (ou um por setor), convertidos em paralelo.
+
+    Usado antes de auditorias (flask relatorios gerar): 'setores' são nomes
+    (todos por padrão) e os que já estão no cache não são refeitos.
+    Retorna [(caminho, nome para download, gerado)].
+    """
+    consulta_setores = Setor.query.filter(Setor.qtd_termometros > 0).order_by(Setor.nome)
+    if setores is not None:
+        consulta_setores = Setor.query.filter(Setor.nome.in_(setores)).order_by(Setor.nome)
+    if por_setor:
+        return _gerar([_trabalho_setor(s, chave_mes) for s in consulta_setores])
+
+    consulta = Termometro.query.order_by(Termometro.identificacao)
+    if setores is not None:
+        consulta = consulta.filter(Termometro.setor_id.in_([s.id for s in consulta_setores]))
+    return _gerar([_trabalho_termometro(t, chave_mes) for t in consulta])
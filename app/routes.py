@@ -1,22 +1,45 @@
-from flask import Blueprint, render_template, redirect, url_for, request, session, flash, send_file, Response, current_app
+from flask import Blueprint, render_template, redirect, url_for, request, session, flash, send_file, Response, current_app, abort, jsonify
 from . import db
-from .models import Termometro, Verificacao, Usuario
+from .models import Termometro, Verificacao, Usuario, StatusDiario, TarefaExportacao, EstatisticaMensal, Setor
 from .forms import TermometroForm, VerificacaoForm, LoginForm, UsuarioForm
 from functools import wraps
-import pandas as pd
+import numpy as np
 import io
-import statistics
-# from weasyprint import HTML  # (mantido comentado; importe se for usar PDF aqui)
-from datetime import datetime, date, time, timedelta
-from collections import defaultdict
-from sqlalchemy import func
+import tempfile
+import hashlib
+import shutil
+from datetime import datetime
+from sqlalchemy import func, and_
 import pytz
-from pathlib import Path
-import qrcode
+from .qr import chave_qr, obter_png
+from .etiquetas import gravar_qr, caminho_qr
+from .tempo import hoje_sp, dia_sp, mes_sp, rotulo_mes
+from .status_diario import atualizar_status_diario
+from .setores import obter_ou_criar_setor, recontar_setores, contagens_de_hoje
+from .eventos import publicar_status, fluxo_sse
+from .busca import filtrar_por_busca, paginar, indexar_termometro, remover_termometro
+from .cache import LRUCache
+from .exportacao import escrever_planilha_geral, escrever_planilha_termometro, MIMETYPE_XLSX
+from .tarefas import iniciar_exportacao, caminho_arquivo
+from .ingestao import importar_lote, LoteInvalido
+from .tokens import origem_da_requisicao
+from .limitador import obter_limitador
+from .relatorios import relatorio_termometro, relatorio_setor, PdfIndisponivel
+from .arquivo import leituras_arquivadas, leituras_do_mes, mes_arquivado, combinar, pasta_arquivo
+from .controle import avaliar_leitura, remover_violacoes, violacoes_recentes, REGRAS
+from .estatistica import (registrar_insercao, registrar_remocao, registrar_alteracao, tocar,
+                          obter as obter_estatistica, meses_do_termometro, desvio_padrao)
 
 
 bp = Blueprint('main', __name__)
 
+TERMOMETROS_POR_PAGINA = 50
+
+# JSON da carta controle por versão do mês (ver dados_carta_controle)
+_cache_carta_controle = LRUCache(maxsize=256)
+# HTML da tabela dos meses fechados do histórico, por versão do mês (ver historico_mes)
+_cache_historico_mes = LRUCache(maxsize=512)
+
 # =========================
 # Decorators
 # =========================
@@ -45,57 +68,64 @@ def admin_requerido(f):
 @bp.route('/')
 def index():
     termo_busca = request.args.get('q', '').strip()
-    setor_filtro = request.args.get('setor')
+    setor_filtro = request.args.get('setor', type=int)
 
     query = Termometro.query
 
     if setor_filtro:
-        query = query.filter_by(setor=setor_filtro)
+        query = query.filter_by(setor_id=setor_filtro)
 
     if termo_busca:
-        termo_like = f"%{termo_busca}%"
-        query = query.filter(
-            (Termometro.identificacao.ilike(termo_like)) |
-            (Termometro.equipamento.ilike(termo_like))
+        query = filtrar_por_busca(query, termo_busca)
+
+    # Paginação por chave: o custo não cresce com o tamanho do inventário
+    apos = request.args.get('apos', type=int)
+    termometros, proximo = paginar(query, apos=apos, por_pagina=TERMOMETROS_POR_PAGINA)
+
+    # Filtro e faixa de resumo por setor: uma linha por setor, com as
+    # contagens do dia já mantidas nas gravações (app/setores.py)
+    setores = Setor.query.filter(Setor.qtd_termometros > 0).order_by(Setor.nome).all()
+    resumo_setores = [(setor, *contagens_de_hoje(setor)) for setor in setores]
+
+    # Alertas do dia (fuso de SP) lidos da tabela status_diario, mantida a
+    # cada gravação de leitura: LEFT JOIN + GROUP BY devolvendo só id e flags,
+    # restrito aos termômetros da página exibida.
+    status_do_dia = (
+        db.session.query(
+            Termometro.id,
+            func.coalesce(func.sum(StatusDiario.qtd_leituras), 0),
+            func.max(StatusDiario.completo)
         )
+        .outerjoin(StatusDiario, and_(
+            StatusDiario.termometro_id == Termometro.id,
+            StatusDiario.data == hoje_sp()
+        ))
+        .filter(Termometro.id.in_([t.id for t in termometros]))
+        .group_by(Termometro.id)
+    )
 
-    termometros = query.all()
-
-    setores = db.session.query(Termometro.setor).distinct().all()
-    setores = [s[0] for s in setores]
-
-    # Recalcular alertas do dia (fuso de SP)
-    sp_tz = pytz.timezone('America/Sao_Paulo')
-    hoje_sp = datetime.now(sp_tz).date()
-    inicio_local = sp_tz.localize(datetime.combine(hoje_sp, time.min))
-    inicio_utc = inicio_local.astimezone(pytz.utc)
-    fim_utc = (inicio_local + timedelta(days=1)).astimezone(pytz.utc)
-
-    verificacoes_hoje = Verificacao.query.filter(
-        Verificacao.data_hora >= inicio_utc,
-        Verificacao.data_hora < fim_utc
-    ).all()
-
-    verificacoes_por_termometro = {v.termometro_id: v for v in verificacoes_hoje}
-
-    termometros_atrasados = []
-    termometros_incompletos = []
+    termometros_atrasados = set()
+    termometros_incompletos = set()
 
-    for termo in termometros:
-        v = verificacoes_por_termometro.get(termo.id)
-        if not v:
-            termometros_atrasados.append(termo.id)
-        elif v.temperatura_max is None or v.temperatura_min is None:
-            termometros_incompletos.append(termo.id)
+    for termo_id, qtd_leituras, tem_completa in status_do_dia:
+        if not qtd_leituras:
+            termometros_atrasados.add(termo_id)
+        elif not tem_completa:
+            termometros_incompletos.add(termo_id)
 
     return render_template(
         'index.html',
         termometros=termometros,
         setores=setores,
+        resumo_setores=resumo_setores,
         setor_filtro=setor_filtro,
         termo_busca=termo_busca,
         termometros_atrasados=termometros_atrasados,
-        termometros_incompletos=termometros_incompletos
+        termometros_incompletos=termometros_incompletos,
+        violacoes=violacoes_recentes() if 'usuario_id' in session else [],
+        regras=REGRAS,
+        apos=apos,
+        proximo=proximo
     )
 
 
@@ -105,25 +135,21 @@ def cadastrar():
     form = TermometroForm()
     if form.validate_on_submit():
         termometro = Termometro(
-            setor=form.setor.data,
+            setor=obter_ou_criar_setor(form.setor.data),
             equipamento=form.equipamento.data,
             especificacao=form.especificacao.data,
             identificacao=form.identificacao.data,
             padrao_identificacao=form.padrao_identificacao.data
         )
         db.session.add(termometro)
+        indexar_termometro(termometro)
+        recontar_setores([termometro.setor_id])
         db.session.commit()
 
         # ✅ GERAÇÃO AUTOMÁTICA DO QR CODE (salvando dentro do projeto)
+        # Ex: .../app/static/qrcodes/ (o mesmo PNG que "flask etiquetas gerar" mantém)
         url = url_for('main.verificar', id=termometro.id, _external=True)
-        img = qrcode.make(url)
-
-        # Ex: .../app/static/qrcodes/
-        qr_dir = Path(current_app.root_path) / "static" / "qrcodes"
-        qr_dir.mkdir(parents=True, exist_ok=True)
-
-        qr_path = qr_dir / f"{termometro.identificacao}.png"
-        img.save(qr_path)
+        gravar_qr(url, caminho_qr(termometro))
 
         flash('Termômetro cadastrado e QR Code gerado com sucesso!', 'success')
         return redirect(url_for('main.index'))
@@ -135,51 +161,10 @@ def cadastrar():
 @login_requerido
 def historico(id):
     termometro = Termometro.query.get_or_404(id)
-    verificacoes = Verificacao.query.filter_by(termometro_id=termometro.id).all()
-
-    # 1. Agrupa por mês/ano inicialmente
-    # O defaultdict cria uma lista automaticamente para cada chave nova
-    agrupado_temp = defaultdict(list)
-    for v in verificacoes:
-        # Garante que usamos a data correta (SP)
-        data_sp = v.get_data_hora_sp()
-        mes_ano = data_sp.strftime('%m/%Y')
-        agrupado_temp[mes_ano].append(v)
-
-    # 2. Processa cada mês para calcular estatísticas e ordenar
-    historico_mensal = {}
-
-    # Iteramos sobre o dicionário temporário
-    for mes, lista_verificacoes in agrupado_temp.items():
-        
-        # Ordena a lista de verificações por data/hora (da mais antiga para a mais nova)
-        lista_ordenada = sorted(lista_verificacoes, key=lambda v: v.get_data_hora_sp())
-
-        # Extrai apenas os valores de temperatura válidos (ignora None) para cálculo
-        valores_mes = [v.temperatura_atual for v in lista_ordenada if v.temperatura_atual is not None]
-
-        # === CÁLCULO ESTATÍSTICO (Igual ao Excel) ===
-        if valores_mes:
-            media_mes = statistics.mean(valores_mes)
-            # Desvio padrão requer pelo menos 2 pontos de dados
-            if len(valores_mes) > 1:
-                desvio_mes = statistics.stdev(valores_mes)
-            else:
-                desvio_mes = 0.0
-        else:
-            media_mes = 0.0
-            desvio_mes = 0.0
-
-        # 3. Monta a estrutura final que o template espera
-        # Agora 'historico_mensal[mes]' não é mais só uma lista, é um objeto com tudo que precisamos
-        historico_mensal[mes] = {
-            'lista': lista_ordenada,  # A lista de objetos Verificacao
-            'media': media_mes,       # A média calculada
-            'desvio': desvio_mes      # O desvio padrão calculado
-        }
 
-    # Opcional: Ordenar os meses (chaves) se quiser que apareçam em ordem cronológica ou inversa na tela
-    # Aqui estamos mantendo a ordem de inserção ou aleatória do dict, mas o template itera sobre ele.
+    # Só os cabeçalhos dos meses (quantidade, média e desvio calculados no banco).
+    # A tabela de cada mês é carregada sob demanda por historico_mes().
+    historico_mensal = _resumos_mensais(termometro.id)
 
     return render_template(
         'historico.html',
@@ -188,30 +173,75 @@ def historico(id):
     )
 
 
-@bp.route('/exportar_excel/<int:id>')
+@bp.route('/historico/<int:id>/<string:mes_ano_str>')
 @login_requerido
-def exportar_excel(id):
+def historico_mes(id, mes_ano_str):
+    """Fragmento HTML com a tabela de um mês (mes_ano_str no formato "08-2025")."""
     termometro = Termometro.query.get_or_404(id)
+    chave_mes = _parse_mes_ano(mes_ano_str)
+
+    # Meses fechados quase nunca mudam: o HTML fica em cache pela versão do mês
+    # (estatistica_mensal), que toda inclusão, edição ou exclusão incrementa.
+    # O mês corrente é sempre renderizado de novo.
+    estatistica = obter_estatistica(termometro.id, chave_mes)
+    chave_cache = None
+    if chave_mes < mes_sp(hoje_sp()):
+        chave_cache = (termometro.id, termometro.criado_em, chave_mes, estatistica.versao if estatistica else 0,
+                       bool(session.get('is_admin')))
+        html = _cache_historico_mes.get(chave_cache)
+        if html is not None:
+            return html
+
+    # Da mais antiga para a mais nova; num ano arquivado vêm também do Parquet
+    lista = leituras_do_mes(termometro.id, chave_mes)
+
+    com_leituras = estatistica is not None and estatistica.qtd_leituras
+    html = render_template(
+        'historico_mes.html',
+        lista=lista,
+        media=estatistica.media if com_leituras else 0.0,
+        desvio=desvio_padrao(estatistica.n, estatistica.m2) if com_leituras else 0.0
+    )
+    if chave_cache is not None:
+        _cache_historico_mes.set(chave_cache, html)
+    return html
+
+
+def _parse_mes_ano(mes_ano_str):
+    """Converte "08-2025" na chave de mes_sp ("2025-08"); 404 se o formato for inválido."""
+    try:
+        mes_ano = datetime.strptime(mes_ano_str, '%m-%Y')
+    except ValueError:
+        abort(404)
+    return mes_sp(mes_ano)
+
+
+def _resumos_mensais(termometro_id):
+    """Quantidade, média e desvio padrão (amostral, igual ao Excel) por mês local de SP.
 
-    data = []
-    for v in termometro.verificacoes:
-        data.append({
-            'Data': v.get_data_hora_sp().strftime('%d/%m/%Y'),
-            'Hora': v.get_data_hora_sp().strftime('%H:%M'),
-            'Responsável': v.responsavel,
-            'Temperatura Atual (ºC)': v.temperatura_atual,
-            'Temperatura Máxima (ºC)': v.temperatura_max,
-            'Temperatura Mínima (ºC)': v.temperatura_min,
-            'Observação': v.observacao
-        })
+    Lidos de estatistica_mensal (uma linha por mês, mantida a cada gravação),
+    sem tocar nas leituras. Retorna um dict ordenado cronologicamente:
+    {'MM/AAAA': {'qtd', 'media', 'desvio'}}.
+    """
+    return {
+        rotulo_mes(linha.mes_sp): {
+            'qtd': linha.qtd_leituras,
+            'media': linha.media,
+            'desvio': desvio_padrao(linha.n, linha.m2),
+        }
+        for linha in meses_do_termometro(termometro_id)
+    }
 
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Verificações')
 
-    output.seek(0)
-    return send_file(output, download_name='controle_temperatura.xlsx', as_attachment=True)
+@bp.route('/exportar_excel/<int:id>')
+@login_requerido
+def exportar_excel(id):
+    termometro = Termometro.query.get_or_404(id)
+
+    saida = tempfile.TemporaryFile()
+    escrever_planilha_termometro(saida, termometro.id)
+    saida.seek(0)
+    return send_file(saida, mimetype=MIMETYPE_XLSX, download_name='controle_temperatura.xlsx', as_attachment=True)
 
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -221,8 +251,19 @@ def login():
 
     form = LoginForm()
     if form.validate_on_submit():
+        # O limite é checado antes da consulta e do hash: uma rajada de
+        # tentativas erradas não consome CPU do worker
+        limitador = obter_limitador()
+        espera = limitador.tentar(form.username.data, request.remote_addr)
+        if espera is not None:
+            flash(f'Muitas tentativas de login. Tente novamente em {espera} segundo(s).', 'danger')
+            resposta = Response(render_template('login.html', form=form), status=429)
+            resposta.headers['Retry-After'] = str(espera)
+            return resposta
+
         usuario = Usuario.query.filter_by(username=form.username.data).first()
         if usuario and usuario.check_senha(form.senha.data):
+            limitador.sucesso(usuario.username)
             session['usuario_id'] = usuario.id
             session['usuario_nome'] = usuario.username
             session['is_admin'] = usuario.is_admin
@@ -246,8 +287,13 @@ def logout():
 @admin_requerido
 def excluir_verificacao(id):
     verificacao = Verificacao.query.get_or_404(id)
+    termometro_id, dia = verificacao.termometro_id, dia_sp(verificacao.data_hora)
+    remover_violacoes(verificacao_id=verificacao.id)
     db.session.delete(verificacao)
+    atualizar_status_diario(termometro_id, dia)
+    registrar_remocao(verificacao)
     db.session.commit()
+    publicar_status(termometro_id, dia)
     flash('Verificação excluída com sucesso!', 'success')
     return redirect(request.referrer or url_for('main.index'))
 
@@ -259,12 +305,17 @@ def editar_verificacao(id):
     form = VerificacaoForm(obj=verificacao)
 
     if form.validate_on_submit():
+        temperatura_anterior = verificacao.temperatura_atual
         verificacao.temperatura_atual = form.temperatura_atual.data
         verificacao.temperatura_max = form.temperatura_max.data
         verificacao.temperatura_min = form.temperatura_min.data
         verificacao.responsavel = form.responsavel.data
         verificacao.observacao = form.observacao.data
+        atualizar_status_diario(verificacao.termometro_id, dia_sp(verificacao.data_hora))
+        registrar_alteracao(verificacao, temperatura_anterior)
+        avaliar_leitura(verificacao)
         db.session.commit()
+        publicar_status(verificacao.termometro_id, verificacao.data_sp)
         flash('Verificação atualizada com sucesso!', 'success')
         return redirect(url_for('main.historico', id=verificacao.termometro_id))
 
@@ -295,11 +346,23 @@ def excluir_termometro(id):
     termometro = Termometro.query.get_or_404(id)
 
     # Apaga as verificações ligadas ao termômetro
+    remover_violacoes(termometro_id=termometro.id)
+    EstatisticaMensal.query.filter_by(termometro_id=termometro.id).delete()
     for verificacao in termometro.verificacoes:
         db.session.delete(verificacao)
+    StatusDiario.query.filter_by(termometro_id=termometro.id).delete()
 
+    remover_termometro(termometro.id)
+    setor_id = termometro.setor_id
     db.session.delete(termometro)
+    recontar_setores([setor_id])
     db.session.commit()
+    # O SQLite pode reaproveitar o id num termômetro novo, com as versões dos
+    # meses recomeçando do 1: os caches por versão não podem sobreviver a ele
+    _cache_historico_mes.clear()
+    _cache_carta_controle.clear()
+    # Pelo mesmo motivo, o arquivo frio dele não pode aparecer no termômetro novo
+    shutil.rmtree(pasta_arquivo() / str(id), ignore_errors=True)
     flash('Termômetro excluído com sucesso!', 'success')
     return redirect(url_for('main.index'))
 
@@ -316,18 +379,10 @@ def verificar(id):
     if not session.get('is_admin'):
         form.responsavel.data = session.get('usuario_nome')
 
-    # Timezone SP e intervalo do dia
-    sp_tz = pytz.timezone('America/Sao_Paulo')
-    hoje_sp = datetime.now(sp_tz).date()
-    inicio_local = sp_tz.localize(datetime.combine(hoje_sp, time.min))
-    inicio_utc = inicio_local.astimezone(pytz.utc)
-    fim_utc = (inicio_local + timedelta(days=1)).astimezone(pytz.utc)
-
-    # Verifica se já existe verificação hoje
+    # Verifica se já existe verificação hoje (dia local de SP)
     primeira = Verificacao.query.filter(
         Verificacao.termometro_id == id,
-        Verificacao.data_hora >= inicio_utc,
-        Verificacao.data_hora < fim_utc
+        Verificacao.data_sp == hoje_sp()
     ).order_by(Verificacao.data_hora).first()
 
     exigir_maxmin = bool(primeira)
@@ -363,8 +418,14 @@ def verificar(id):
                 termometro_id=id
             )
             db.session.add(v)
+            atualizar_status_diario(id, dia_sp(v.data_hora))
+            registrar_insercao(v)
+            violacoes = avaliar_leitura(v)
             db.session.commit()
+            publicar_status(id, v.data_sp)
             flash('Leitura registrada com sucesso!', 'success')
+            for violacao in violacoes:
+                flash(f'Carta controle: {REGRAS[violacao.regra]} ({violacao.valor} °C).', 'warning')
             return redirect(url_for('main.historico', id=id))
 
     # Segunda leitura do dia (atualiza registro com máx/mín)
@@ -376,7 +437,10 @@ def verificar(id):
         primeira.temperatura_max = form.temperatura_max.data
         primeira.temperatura_min = form.temperatura_min.data
         primeira.observacao = observacao_final
+        atualizar_status_diario(id, dia_sp(primeira.data_hora))
+        tocar(id, primeira.mes_sp)
         db.session.commit()
+        publicar_status(id, primeira.data_sp)
         flash('Leitura final do dia atualizada com Máx/Mín.', 'success')
         return redirect(url_for('main.historico', id=id))
 
@@ -405,11 +469,15 @@ def editar_termometro(id):
     form = TermometroForm(obj=termometro)
 
     if form.validate_on_submit():
-        termometro.setor = form.setor.data
+        setor_anterior_id = termometro.setor_id
+        termometro.setor = obter_ou_criar_setor(form.setor.data)
         termometro.equipamento = form.equipamento.data
         termometro.especificacao = form.especificacao.data
         termometro.identificacao = form.identificacao.data
         termometro.padrao_identificacao = form.padrao_identificacao.data
+        indexar_termometro(termometro)
+        if termometro.setor_id != setor_anterior_id:
+            recontar_setores([setor_anterior_id, termometro.setor_id])
         db.session.commit()
         flash('Termômetro atualizado com sucesso!', 'success')
         return redirect(url_for('main.index'))
@@ -420,106 +488,255 @@ def editar_termometro(id):
 @bp.route('/exportar_planilha_geral')
 @admin_requerido
 def exportar_planilha_geral():
-    termometros = Termometro.query.all()
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for termometro in termometros:
-            dados = []
-            for v in termometro.verificacoes:
-                dados.append({
-                    'Data': v.get_data_hora_sp().strftime('%d/%m/%Y'),
-                    'Hora': v.get_data_hora_sp().strftime('%H:%M'),
-                    'Responsável': v.responsavel,
-                    'T Atual (°C)': v.temperatura_atual,
-                    'T Máx (°C)': v.temperatura_max,
-                    'T Mín (°C)': v.temperatura_min,
-                    'Observação': v.observacao
-                })
-
-            df = pd.DataFrame(dados)
-            aba = termometro.identificacao or f"Termometro_{termometro.id}"
-            df.to_excel(writer, sheet_name=aba[:31], index=False)  # Excel limita o nome da aba a 31 chars
-
-    output.seek(0)
-    return send_file(output, download_name='dados_termometros.xlsx', as_attachment=True)
+    # Arquivo temporário em disco (apagado ao fechar): a planilha é escrita em
+    # fluxo e enviada sem nunca ficar inteira na memória do worker.
+    saida = tempfile.TemporaryFile()
+    escrever_planilha_geral(saida)
+    saida.seek(0)
+    return send_file(saida, mimetype=MIMETYPE_XLSX, download_name='dados_termometros.xlsx', as_attachment=True)
+
+
+# =========================
+# Exportações em segundo plano
+# =========================
+@bp.route('/exportacoes', methods=['POST'])
+@login_requerido
+def nova_exportacao():
+    tipo = request.form.get('tipo')
+    termometro_id = request.form.get('termometro_id', type=int)
+
+    if tipo == 'planilha_geral' and not session.get('is_admin'):
+        flash('Acesso restrito a administradores.', 'danger')
+        return redirect(url_for('main.index'))
+    if tipo == 'termometro':
+        Termometro.query.get_or_404(termometro_id)
+    else:
+        termometro_id = None
+
+    try:
+        tarefa = iniciar_exportacao(tipo, termometro_id=termometro_id, usuario_id=session.get('usuario_id'))
+    except ValueError:
+        abort(400)
+
+    return redirect(url_for('main.exportacao', id=tarefa.id))
+
+
+@bp.route('/exportacoes/<string:id>')
+@login_requerido
+def exportacao(id):
+    tarefa = _tarefa_do_usuario(id)
+    return render_template('exportacao.html', tarefa=tarefa)
+
+
+@bp.route('/exportacoes/<string:id>/status')
+@login_requerido
+def status_exportacao(id):
+    tarefa = _tarefa_do_usuario(id)
+    return {
+        'id': tarefa.id,
+        'status': tarefa.status,
+        'erro': tarefa.erro,
+        'download': url_for('main.baixar_exportacao', id=tarefa.id) if tarefa.status == 'concluida' else None
+    }
+
+
+@bp.route('/exportacoes/<string:id>/download')
+@login_requerido
+def baixar_exportacao(id):
+    tarefa = _tarefa_do_usuario(id)
+    if tarefa.status != 'concluida' or not caminho_arquivo(tarefa).exists():
+        abort(404)
+    return send_file(caminho_arquivo(tarefa), mimetype=MIMETYPE_XLSX,
+                     download_name=tarefa.nome_download, as_attachment=True)
+
+
+def _tarefa_do_usuario(id):
+    """Tarefa de exportação visível para o usuário logado (o dono ou um admin)."""
+    tarefa = TarefaExportacao.query.get_or_404(id)
+    if not session.get('is_admin') and tarefa.usuario_id != session.get('usuario_id'):
+        abort(404)
+    return tarefa
+
+
+# =========================
+# Ingestão em massa (data loggers)
+# =========================
+@bp.route('/ingestao/leituras', methods=['POST'])
+def ingerir_leituras():
+    origem = origem_da_requisicao('INGESTAO_TOKENS')
+    if origem is None:
+        return {'erro': 'Não autenticado.'}, 401
+
+    arquivo = request.files.get('arquivo')
+    if arquivo is not None:
+        conteudo, nome = arquivo.read(), arquivo.filename
+    else:
+        conteudo, nome = request.get_data(), None
+
+    formato = 'json' if (request.is_json or (nome or '').lower().endswith('.json')) else 'csv'
+    try:
+        lote, novo = importar_lote(
+            conteudo, formato=formato,
+            chave=request.headers.get('Idempotency-Key'),
+            origem=origem, arquivo=nome
+        )
+    except LoteInvalido as e:
+        return {'erro': 'Lote inválido.', 'erros': [{'linha': l, 'mensagem': m} for l, m in e.erros]}, 400
+
+    return {
+        'lote': lote.chave,
+        'leituras': lote.qtd_leituras,
+        'duplicado': not novo
+    }, 201 if novo else 200
+
+
+@bp.route('/eventos/status')
+@login_requerido
+def eventos_status():
+    """Server-Sent Events com as mudanças de status do dia (o painel atualiza as linhas sozinho)."""
+    resposta = Response(fluxo_sse(request.headers.get('Last-Event-ID')), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'  # nginx: não segurar o fluxo em buffer
+    return resposta
 
 
 @bp.route('/qr/<int:id>')
 @login_requerido
 def gerar_qr(id):
+    # A URL codificada nunca muda para um termômetro: o PNG vem do cache
+    # (memória/disco) e o navegador pode reaproveitá-lo pelo ETag.
     url = url_for('main.verificar', id=id, _external=True)
-    img = qrcode.make(url)
+    chave = chave_qr(url)
+
+    if chave in request.if_none_match:
+        resposta = Response(status=304)
+    else:
+        _, png = obter_png(url)
+        resposta = send_file(io.BytesIO(png), mimetype='image/png', download_name=f'termometro_{id}_qr.png')
+
+    resposta.set_etag(chave)
+    resposta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return resposta
 
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
+@bp.route('/relatorio/<int:id>/<string:mes_ano_str>.pdf')
+@login_requerido
+def relatorio_pdf(id, mes_ano_str):
+    """Carta controle do mês em PDF (mes_ano_str no formato "08-2025")."""
+    termometro = Termometro.query.get_or_404(id)
+    chave_mes = _parse_mes_ano(mes_ano_str)
+    try:
+        caminho, nome = relatorio_termometro(termometro, chave_mes)
+    except PdfIndisponivel as e:
+        current_app.logger.error('%s', e)
+        flash('A geração de PDF não está disponível neste servidor.', 'danger')
+        return redirect(url_for('main.historico', id=termometro.id))
+    return send_file(caminho, mimetype='application/pdf', download_name=nome)
 
-    return send_file(buffer, mimetype='image/png', download_name=f'termometro_{id}_qr.png')
 
-@bp.route('/dados_carta_controle/<int:id>/<string:mes_ano_str>') # Recebe o mês também para filtrar
+@bp.route('/relatorio/setor.pdf')
+@login_requerido
+def relatorio_setor_pdf():
+    """Cartas controle de todos os termômetros de um setor (?setor=<id>&mes=AAAA-MM)."""
+    setor = Setor.query.get_or_404(request.args.get('setor', 0, type=int))
+    try:
+        chave_mes = mes_sp(datetime.strptime(request.args.get('mes', ''), '%Y-%m'))
+    except ValueError:
+        abort(404)
+    try:
+        caminho, nome = relatorio_setor(setor, chave_mes)
+    except PdfIndisponivel as e:
+        current_app.logger.error('%s', e)
+        flash('A geração de PDF não está disponível neste servidor.', 'danger')
+        return redirect(url_for('main.index', setor=setor.id))
+    return send_file(caminho, mimetype='application/pdf', download_name=nome)
+
+
+@bp.route('/dados_carta_controle/<int:id>/<string:mes_ano_str>')
 @login_requerido
 def dados_carta_controle(id, mes_ano_str):
-    # Exemplo de mes_ano_str: "08-2025" (precisa adaptar no frontend para enviar isso)
-    # Ou simplifique pegando os ultimos 30 registros se preferir.
-    
+    # mes_ano_str no formato "08-2025" (o mesmo das abas do histórico)
     termometro = Termometro.query.get_or_404(id)
-    
-    # Aqui você deve filtrar as verificações do mês específico
-    # (Simplificando pegando todas para o exemplo, mas o ideal é filtrar por data)
-    verificacoes = Verificacao.query.filter_by(termometro_id=id).order_by(Verificacao.data_hora.asc()).all()
-    
-    # Extrai os valores (ignora onde não tem temperatura)
-    valores = [v.temperatura_atual for v in verificacoes if v.temperatura_atual is not None]
-    datas = [v.get_data_hora_sp().strftime('%d/%m') for v in verificacoes if v.temperatura_atual is not None]
+    chave_mes = _parse_mes_ano(mes_ano_str)
+
+    # A versão do mês (estatistica_mensal) muda a cada inclusão, edição ou
+    # exclusão de leitura: ela vira o ETag e a chave do cache, então um mês
+    # fechado não é recalculado. criado_em separa um termômetro novo que
+    # reaproveitou o id (as versões recomeçam do 1).
+    estatistica = obter_estatistica(termometro.id, chave_mes)
+    versao = (f'{termometro.id}:{termometro.criado_em.isoformat()}:{mes_ano_str}:'
+              f'{estatistica.versao if estatistica else 0}')
+    etag = hashlib.sha1(versao.encode()).hexdigest()
+
+    if etag in request.if_none_match:
+        resposta = Response(status=304)
+    else:
+        dados = _cache_carta_controle.get(etag)
+        if dados is None:
+            dados = _montar_carta_controle(termometro.id, chave_mes, estatistica)
+            _cache_carta_controle.set(etag, dados)
+        resposta = jsonify(dados)
+
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+
+def _montar_carta_controle(termometro_id, chave_mes, estatistica):
+    """JSON do Chart.js com a série do mês e as linhas de controle (±1/2/3 S e média)."""
+    linhas = Verificacao.query.with_entities(
+        Verificacao.id, Verificacao.data_hora, Verificacao.data_sp, Verificacao.temperatura_atual
+    ).filter(
+        Verificacao.termometro_id == termometro_id,
+        Verificacao.mes_sp == chave_mes,
+        Verificacao.temperatura_atual.isnot(None)
+    ).order_by(Verificacao.data_hora.asc()).all()
+
+    if mes_arquivado(termometro_id, chave_mes):
+        arquivadas = [v for v in leituras_arquivadas(termometro_id, chave_mes) if v.temperatura_atual is not None]
+        linhas = combinar(arquivadas, linhas)
+
+    valores = np.array([v.temperatura_atual for v in linhas], dtype=float)
+    datas = [v.data_sp.strftime('%d/%m') for v in linhas]
+    qtd = len(valores)
 
     # === O CÉREBRO MATEMÁTICO (Igual sua planilha) ===
-    if len(valores) > 1:
-        media = statistics.mean(valores)       # Calcula a Média (X barra)
-        desvio = statistics.stdev(valores)     # Calcula o Desvio Padrão (Sigma)
-    else:
-        # Se tiver menos de 2 dados, não dá pra calcular desvio
-        media = valores[0] if valores else 0
-        desvio = 0
-
-    # Calcula as linhas da Carta Controle
-    s3_sup = media + (3 * desvio)  # NC Superior (+3S) Linha Vermelha
-    s2_sup = media + (2 * desvio)  # NA Superior (+2S) Linha Amarela
-    s1_sup = media + (1 * desvio)  # (+1S) Linha Verde
-    
-    s1_inf = media - (1 * desvio)  # (-1S) Linha Verde
-    s2_inf = media - (2 * desvio)  # NA Inferior (-2S) Linha Amarela
-    s3_inf = media - (3 * desvio)  # NC Inferior (-3S) Linha Vermelha
-
-    # Prepara o JSON para o Gráfico
-    # Criamos listas repetindo o mesmo valor para formar linhas retas no gráfico
-    qtd = len(datas)
-    
+    # Média e desvio padrão amostral vêm prontos de estatistica_mensal;
+    # com menos de 2 dados não dá pra calcular desvio
+    media = estatistica.media if estatistica and estatistica.n else 0.0
+    desvio = desvio_padrao(estatistica.n, estatistica.m2) if estatistica else 0.0
+
+    # Linhas da Carta Controle, todas de uma vez:
+    # +3S/-3S (NC, vermelha), +2S/-2S (NA, amarela), +1S/-1S (verde) e média (laranja)
+    fatores = np.array([3, -3, 2, -2, 1, -1, 0])
+    limites = media + fatores * desvio
+    s3_sup, s3_inf, s2_sup, s2_inf, s1_sup, s1_inf, _ = limites.tolist()
+    series = np.repeat(limites[:, np.newaxis], qtd, axis=1).tolist()
+
     return {
         'labels': datas,
         'datasets': [
             {
                 'label': 'Resultado (°C)',
-                'data': valores,
+                'data': valores.tolist(),
                 'borderColor': 'black',
                 'borderWidth': 2,
                 'pointBackgroundColor': 'blue',
                 'tension': 0 # Linha reta entre pontos
             },
             # Linhas de Controle (Vermelhas)
-            {'label': '+3S (NC)', 'data': [s3_sup]*qtd, 'borderColor': 'red', 'borderWidth': 1, 'pointRadius': 0},
-            {'label': '-3S (NC)', 'data': [s3_inf]*qtd, 'borderColor': 'red', 'borderWidth': 1, 'pointRadius': 0},
-            
+            {'label': '+3S (NC)', 'data': series[0], 'borderColor': 'red', 'borderWidth': 1, 'pointRadius': 0},
+            {'label': '-3S (NC)', 'data': series[1], 'borderColor': 'red', 'borderWidth': 1, 'pointRadius': 0},
+
             # Linhas de Alerta (Amarelas)
-            {'label': '+2S (NA)', 'data': [s2_sup]*qtd, 'borderColor': '#FFD700', 'borderWidth': 1, 'pointRadius': 0, 'borderDash': [5,5]},
-            {'label': '-2S (NA)', 'data': [s2_inf]*qtd, 'borderColor': '#FFD700', 'borderWidth': 1, 'pointRadius': 0, 'borderDash': [5,5]},
-            
+            {'label': '+2S (NA)', 'data': series[2], 'borderColor': '#FFD700', 'borderWidth': 1, 'pointRadius': 0, 'borderDash': [5,5]},
+            {'label': '-2S (NA)', 'data': series[3], 'borderColor': '#FFD700', 'borderWidth': 1, 'pointRadius': 0, 'borderDash': [5,5]},
+
             # Linhas de 1 Sigma (Verdes)
-            {'label': '+1S', 'data': [s1_sup]*qtd, 'borderColor': 'green', 'borderWidth': 0.5, 'pointRadius': 0},
-            {'label': '-1S', 'data': [s1_inf]*qtd, 'borderColor': 'green', 'borderWidth': 0.5, 'pointRadius': 0},
-            
+            {'label': '+1S', 'data': series[4], 'borderColor': 'green', 'borderWidth': 0.5, 'pointRadius': 0},
+            {'label': '-1S', 'data': series[5], 'borderColor': 'green', 'borderWidth': 0.5, 'pointRadius': 0},
+
             # Média (Laranja)
-            {'label': 'Média', 'data': [media]*qtd, 'borderColor': 'orange', 'borderWidth': 2, 'pointRadius': 0, 'borderDash': [2,2]}
+            {'label': 'Média', 'data': series[6], 'borderColor': 'orange', 'borderWidth': 2, 'pointRadius': 0, 'borderDash': [2,2]}
         ],
         # Enviamos os valores calculados também para preencher a tabela se quiser
         'estatisticas': {
@@ -0,0 +1,73 @@
+from sqlalchemy import and_, bindparam, func, select
+from . import db
+from .models import Setor, StatusDiario, Termometro
+from .tempo import hoje_sp
+
+S = Setor.__table__
+
+
+def obter_ou_criar_setor(nome):
+    """Setor com esse nome (sem espaços nas pontas); criado se ainda não existe. Não faz commit."""
+    nome = (nome or '').strip()
+    if not nome:
+        return None
+    setor = Setor.query.filter_by(nome=nome).first()
+    if setor is None:
+        setor = Setor(nome=nome)
+        db.session.add(setor)
+        db.session.flush()
+    return setor
+
+
+def _contagem(*condicoes):
+    """Subconsulta correlacionada: termômetros do setor (da linha atualizada) com o status de hoje."""
+    return (
+        select(func.count(Termometro.id))
+        .select_from(Termometro)
+        .outerjoin(StatusDiario, and_(StatusDiario.termometro_id == Termometro.id,
+                                      StatusDiario.data == bindparam('hoje')))
+        .where(Termometro.setor_id == S.c.id, *condicoes)
+        .scalar_subquery()
+    )
+
+
+def recontar_setores(setor_ids=None):
+    """Recalcula as contagens de setor (todos ou só os ids informados) para o dia de hoje.
+
+    Um único UPDATE com subconsultas sobre os termômetros do setor e o
+    status_diario de hoje: custa o tamanho do setor, não o das leituras, e é
+    atômico como as atualizações de estatistica_mensal. Chamada depois de
+    cada gravação que muda o status de hoje ou os termômetros de um setor.
+    Não faz commit.
+    """
+    if setor_ids is not None:
+        setor_ids = {i for i in setor_ids if i is not None}
+        if not setor_ids:
+            return
+    db.session.flush()
+    atualizar = S.update().values(
+        qtd_termometros=_contagem(),
+        qtd_atrasados=_contagem(StatusDiario.id.is_(None)),
+        qtd_incompletos=_contagem(StatusDiario.completo.is_(False)),
+        dia=bindparam('hoje'),
+    )
+    if setor_ids is not None:
+        atualizar = atualizar.where(S.c.id.in_(setor_ids))
+    db.session.execute(atualizar, {'hoje': hoje_sp()})
+
+
+def recontar_setores_dos_termometros(termometro_ids):
+    """recontar_setores para os setores dos termômetros informados."""
+    setor_ids = {i for (i,) in db.session.query(Termometro.setor_id).filter(Termometro.id.in_(list(termometro_ids)))}
+    recontar_setores(setor_ids)
+
+
+def contagens_de_hoje(setor):
+    """(termômetros, atrasados, incompletos) do setor hoje.
+
+    A virada do dia é preguiçosa: se nenhuma gravação recontou o setor hoje,
+    nenhum termômetro dele tem leitura hoje, então todos estão atrasados.
+    """
+    if setor.dia != hoje_sp():
+        return setor.qtd_termometros, setor.qtd_termometros, 0
+    return setor.qtd_termometros, setor.qtd_atrasados, setor.qtd_incompletos
@@ -0,0 +1,146 @@
+from datetime import date
+from sqlalchemy import func, case, and_
+from . import db
+from .models import Verificacao, StatusDiario
+from .arquivo import anos_arquivados, ler_arquivo, termometros_arquivados
+from .setores import recontar_setores, recontar_setores_dos_termometros
+from .tempo import hoje_sp
+
+
+def _leitura_completa():
+    return case(
+        (and_(Verificacao.temperatura_max.isnot(None), Verificacao.temperatura_min.isnot(None)), 1),
+        else_=0
+    )
+
+
+def atualizar_status_diario(termometro_id, dia):
+    """Recalcula a linha de status_diario de um termômetro num dia local de SP.
+
+    Deve ser chamada antes do commit de quem alterou as leituras, para que a
+    tabela seja atualizada na mesma transação. Não faz commit.
+    """
+    db.session.flush()
+
+    qtd_leituras, completas = db.session.query(
+        func.count(Verificacao.id),
+        func.max(_leitura_completa())
+    ).filter(
+        Verificacao.termometro_id == termometro_id,
+        Verificacao.data_sp == dia
+    ).one()
+
+    status = StatusDiario.query.filter_by(termometro_id=termometro_id, data=dia).first()
+
+    # Sem leituras no dia: a ausência da linha já significa "atrasado"
+    if not qtd_leituras:
+        if status is not None:
+            db.session.delete(status)
+        status = None
+    else:
+        if status is None:
+            status = StatusDiario(termometro_id=termometro_id, data=dia)
+            db.session.add(status)
+        status.qtd_leituras = qtd_leituras
+        status.completo = bool(completas)
+
+    # As contagens do setor só dizem respeito a hoje
+    if dia == hoje_sp():
+        recontar_setores_dos_termometros([termometro_id])
+    return status
+
+
+def reconstruir_status_diario(inicio=None, fim=None, lote=5000):
+    """Regenera status_diario a partir das leituras, opcionalmente só entre os dias inicio..fim (SP).
+
+    Retorna a quantidade de linhas gravadas. Faz commit.
+    """
+    total = regravar_status_diario(inicio=inicio, fim=fim, lote=lote)
+    db.session.commit()
+    return total
+
+
+def _agregado_arquivado(inicio=None, fim=None, termometro_ids=None):
+    """{(termometro_id, dia): (qtd_leituras, completo)} dos anos arquivados: Parquet mais as leituras tardias da tabela."""
+    import pandas as pd
+
+    colunas = ['id', 'data_hora', 'data_sp', 'temperatura_max', 'temperatura_min']
+    agregado = {}
+    for termometro_id in termometros_arquivados():
+        if termometro_ids is not None and termometro_id not in termometro_ids:
+            continue
+        for ano in anos_arquivados(termometro_id):
+            if (inicio and ano < inicio.year) or (fim and ano > fim.year):
+                continue
+            quentes = db.session.query(*[getattr(Verificacao, c) for c in colunas]).filter(
+                Verificacao.termometro_id == termometro_id,
+                Verificacao.data_sp >= date(ano, 1, 1), Verificacao.data_sp < date(ano + 1, 1, 1)
+            ).all()
+            df = pd.concat([
+                ler_arquivo(termometro_id, ano)[colunas],
+                pd.DataFrame(quentes, columns=colunas).astype({'data_hora': 'datetime64[us]'}),
+            ], ignore_index=True)
+            df = df.drop_duplicates(['id', 'data_hora'], keep='last')
+            df['data_sp'] = pd.to_datetime(df['data_sp']).dt.date
+            if inicio:
+                df = df[df['data_sp'] >= inicio]
+            if fim:
+                df = df[df['data_sp'] <= fim]
+            df['completa'] = df['temperatura_max'].notna() & df['temperatura_min'].notna()
+            for dia, grupo in df.groupby('data_sp'):
+                agregado[(termometro_id, dia)] = (int(len(grupo)), bool(grupo['completa'].any()))
+    return agregado
+
+
+def regravar_status_diario(inicio=None, fim=None, termometro_ids=None, lote=5000):
+    """Apaga e regrava, por agregação no banco, as linhas de status_diario do recorte.
+
+    Usada pela reconstrução e pela ingestão em massa (só os termômetros e dias
+    do lote). Os dias de anos arquivados são agregados a partir do Parquet
+    (com as leituras tardias da tabela). Retorna a quantidade de linhas
+    gravadas. Não faz commit.
+    """
+    consulta = db.session.query(
+        Verificacao.termometro_id,
+        Verificacao.data_sp,
+        func.count(Verificacao.id),
+        func.max(_leitura_completa())
+    ).filter(Verificacao.termometro_id.isnot(None), Verificacao.data_sp.isnot(None))
+
+    apagar = StatusDiario.query
+    if inicio:
+        consulta = consulta.filter(Verificacao.data_sp >= inicio)
+        apagar = apagar.filter(StatusDiario.data >= inicio)
+    if fim:
+        consulta = consulta.filter(Verificacao.data_sp <= fim)
+        apagar = apagar.filter(StatusDiario.data <= fim)
+    if termometro_ids is not None:
+        consulta = consulta.filter(Verificacao.termometro_id.in_(termometro_ids))
+        apagar = apagar.filter(StatusDiario.termometro_id.in_(termometro_ids))
+
+    db.session.flush()
+    arquivado = _agregado_arquivado(inicio, fim, termometro_ids)
+    apagar.delete(synchronize_session=False)
+
+    total = 0
+    linhas = [{'termometro_id': termometro_id, 'data': dia, 'qtd_leituras': qtd, 'completo': completo}
+              for (termometro_id, dia), (qtd, completo) in arquivado.items()]
+    for termometro_id, dia, qtd, completas in consulta.group_by(Verificacao.termometro_id, Verificacao.data_sp).yield_per(lote):
+        if (termometro_id, dia) in arquivado:
+            continue  # o agregado do arquivo já conta as leituras tardias da tabela
+        linhas.append({'termometro_id': termometro_id, 'data': dia, 'qtd_leituras': qtd, 'completo': bool(completas)})
+        if len(linhas) >= lote:
+            db.session.execute(StatusDiario.__table__.insert(), linhas)
+            total += len(linhas)
+            linhas = []
+    if linhas:
+        db.session.execute(StatusDiario.__table__.insert(), linhas)
+        total += len(linhas)
+
+    hoje = hoje_sp()
+    if (inicio is None or inicio <= hoje) and (fim is None or fim >= hoje):
+        if termometro_ids is None:
+            recontar_setores()
+        else:
+            recontar_setores_dos_termometros(termometro_ids)
+    return total
@@ -0,0 +1,112 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from flask import current_app
+from . import db
+from .models import TarefaExportacao
+from .exportacao import escrever_planilha_geral, escrever_planilha_termometro
+
+# Valores padrão (podem ser sobrescritos na configuração do app)
+WORKERS_PADRAO = 2
+RETENCAO_HORAS_PADRAO = 24
+
+TIPOS_EXPORTACAO = {
+    'planilha_geral': 'dados_termometros.xlsx',
+    'termometro': 'controle_temperatura.xlsx',
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('EXPORTACAO_WORKERS', WORKERS_PADRAO)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exportacao')
+        return _executor
+
+
+def pasta_exportacoes():
+    pasta = Path(current_app.instance_path) / 'exportacoes'
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+
+def caminho_arquivo(tarefa):
+    return pasta_exportacoes() / tarefa.arquivo
+
+
+def iniciar_exportacao(tipo, termometro_id=None, usuario_id=None):
+    """Registra a tarefa no banco e a coloca na fila do pool. Retorna a TarefaExportacao."""
+    if tipo not in TIPOS_EXPORTACAO:
+        raise ValueError(f'Tipo de exportação desconhecido: {tipo}')
+
+    limpar_exportacoes_antigas()
+
+    tarefa = TarefaExportacao(
+        id=uuid.uuid4().hex,
+        tipo=tipo,
+        termometro_id=termometro_id,
+        usuario_id=usuario_id,
+        status='pendente',
+        nome_download=TIPOS_EXPORTACAO[tipo]
+    )
+    db.session.add(tarefa)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor().submit(_executar, app, tarefa.id)
+    return tarefa
+
+
+def _executar(app, tarefa_id):
+    """Corpo da tarefa, executado numa thread do pool com o seu próprio app context."""
+    with app.app_context():
+        tarefa = db.session.get(TarefaExportacao, tarefa_id)
+        if tarefa is None:
+            return
+        tarefa.status = 'executando'
+        db.session.commit()
+
+        arquivo = f'{tarefa.id}.xlsx'
+        destino = pasta_exportacoes() / arquivo
+        try:
+            if tarefa.tipo == 'planilha_geral':
+                escrever_planilha_geral(str(destino))
+            else:
+                escrever_planilha_termometro(str(destino), tarefa.termometro_id)
+        except Exception as e:
+            app.logger.exception('Falha na exportação %s', tarefa_id)
+            db.session.rollback()
+            destino.unlink(missing_ok=True)
+            tarefa.status = 'erro'
+            tarefa.erro = str(e)
+        else:
+            tarefa.status = 'concluida'
+            tarefa.arquivo = arquivo
+        tarefa.concluido_em = datetime.utcnow()
+        db.session.commit()
+
+
+def limpar_exportacoes_antigas():
+    """Apaga tarefas (e arquivos) mais antigas que o período de retenção. Faz commit."""
+    horas = current_app.config.get('EXPORTACAO_RETENCAO_HORAS', RETENCAO_HORAS_PADRAO)
+    limite = datetime.utcnow() - timedelta(hours=horas)
+
+    antigas = TarefaExportacao.query.filter(TarefaExportacao.criado_em < limite).all()
+    for tarefa in antigas:
+        if tarefa.arquivo:
+            caminho_arquivo(tarefa).unlink(missing_ok=True)
+        db.session.delete(tarefa)
+
+    # Arquivos órfãos (ex.: tarefa interrompida por reinício do servidor)
+    for caminho in pasta_exportacoes().glob('*.xlsx'):
+        if datetime.utcfromtimestamp(caminho.stat().st_mtime) < limite:
+            caminho.unlink(missing_ok=True)
+
+    db.session.commit()
+    return len(antigas)
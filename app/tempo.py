@@ -0,0 +1,40 @@
+from datetime import datetime
+import pytz
+
+# Fuso usado em todo o sistema (as datas são gravadas em UTC naive)
+SP_TZ = pytz.timezone('America/Sao_Paulo')
+
+
+def hoje_sp():
+    """Data corrente no fuso de São Paulo."""
+    return datetime.now(SP_TZ).date()
+
+
+def para_sp(data_hora):
+    """Converte um datetime UTC (naive ou aware) para o horário de SP."""
+    if data_hora.tzinfo is None:
+        data_hora = pytz.utc.localize(data_hora)
+    return data_hora.astimezone(SP_TZ)
+
+
+def dia_sp(data_hora):
+    """Dia local de SP de um datetime UTC."""
+    return para_sp(data_hora).date()
+
+
+def converter_para_sp(datas):
+    """Converte em bloco uma sequência de datetimes UTC naive (DatetimeIndex de SP)."""
+    import pandas as pd
+
+    return pd.DatetimeIndex(pd.to_datetime(list(datas))).tz_localize('UTC').tz_convert(SP_TZ.zone)
+
+
+def mes_sp(dia):
+    """Chave do mês gravada em verificacao.mes_sp ('AAAA-MM')."""
+    return f'{dia.year:04d}-{dia.month:02d}'
+
+
+def rotulo_mes(chave_mes):
+    """'AAAA-MM' -> 'MM/AAAA' (como o mês aparece nas telas)."""
+    ano, mes = chave_mes.split('-')
+    return f'{mes}/{ano}'
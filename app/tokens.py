@@ -0,0 +1,18 @@
+import hmac
+from flask import current_app, request, session
+
+
+def origem_da_requisicao(chave_config):
+    """Quem está chamando: o nome do token (Authorization: Bearer) ou o usuário logado.
+
+    'chave_config' é a configuração com o dict {token: nome} aceito pelo
+    recurso. Retorna None se o token for inválido ou não houver sessão.
+    """
+    cabecalho = request.headers.get('Authorization', '')
+    if cabecalho.startswith('Bearer '):
+        enviado = cabecalho[len('Bearer '):].strip()
+        for token, nome in current_app.config.get(chave_config, {}).items():
+            if hmac.compare_digest(enviado, token):
+                return nome
+        return None
+    return session.get('usuario_nome')
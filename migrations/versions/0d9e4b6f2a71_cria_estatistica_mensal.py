@@ -0,0 +1,59 @@
+"""Cria a tabela estatistica_mensal
+
+Revision ID: 0d9e4b6f2a71
+Revises: f5a1c3e97b20
+Create Date: 2026-10-18 20:03:37.140582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d9e4b6f2a71'
+down_revision = 'f5a1c3e97b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('estatistica_mensal',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('termometro_id', sa.Integer(), nullable=False),
+    sa.Column('mes_sp', sa.String(length=7), nullable=False),
+    sa.Column('qtd_leituras', sa.Integer(), nullable=False),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.Column('media', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.Column('minimo', sa.Float(), nullable=True),
+    sa.Column('maximo', sa.Float(), nullable=True),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['termometro_id'], ['termometro.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('termometro_id', 'mes_sp', name='uq_estatistica_mensal_termometro_mes')
+    )
+
+    # Preenche com as leituras existentes (média e M2 em duas passadas, no banco)
+    op.execute('''
+        INSERT INTO estatistica_mensal (termometro_id, mes_sp, qtd_leituras, n, media, m2, minimo, maximo, versao)
+        SELECT v.termometro_id, v.mes_sp,
+               COUNT(v.id),
+               COUNT(v.temperatura_atual),
+               COALESCE(g.media, 0.0),
+               COALESCE(SUM((v.temperatura_atual - g.media) * (v.temperatura_atual - g.media)), 0.0),
+               MIN(v.temperatura_atual),
+               MAX(v.temperatura_atual),
+               1
+        FROM verificacao v
+        JOIN (
+            SELECT termometro_id, mes_sp, AVG(temperatura_atual) AS media
+            FROM verificacao
+            WHERE termometro_id IS NOT NULL AND mes_sp IS NOT NULL
+            GROUP BY termometro_id, mes_sp
+        ) g ON g.termometro_id = v.termometro_id AND g.mes_sp = v.mes_sp
+        GROUP BY v.termometro_id, v.mes_sp
+    ''')
+
+
+def downgrade():
+    op.drop_table('estatistica_mensal')
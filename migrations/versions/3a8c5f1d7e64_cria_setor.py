@@ -0,0 +1,80 @@
+"""Cria a tabela setor e troca termometro.setor por setor_id
+
+Revision ID: 3a8c5f1d7e64
+Revises: 0d9e4b6f2a71
+Create Date: 2026-10-18 22:41:09.518204
+
+"""
+from datetime import datetime
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a8c5f1d7e64'
+down_revision = '0d9e4b6f2a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('setor',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('qtd_termometros', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('qtd_atrasados', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('qtd_incompletos', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('dia', sa.Date(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nome')
+    )
+
+    # Um setor por texto distinto já usado (sem espaços nas pontas)
+    op.execute('''
+        INSERT INTO setor (nome)
+        SELECT DISTINCT trim(setor) FROM termometro
+        WHERE setor IS NOT NULL AND trim(setor) <> ''
+    ''')
+
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('setor_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_termometro_setor_id', ['setor_id'], unique=False)
+        batch_op.create_foreign_key('fk_termometro_setor_id_setor', 'setor', ['setor_id'], ['id'])
+
+    op.execute('UPDATE termometro SET setor_id = (SELECT id FROM setor WHERE setor.nome = trim(termometro.setor))')
+
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.drop_column('setor')
+
+    # Contagens do dia de hoje (SP), como app/setores.py:recontar_setores
+    hoje = datetime.now(pytz.timezone('America/Sao_Paulo')).date()
+    op.get_bind().execute(sa.text('''
+        UPDATE setor SET
+            qtd_termometros = (SELECT COUNT(*) FROM termometro t WHERE t.setor_id = setor.id),
+            qtd_atrasados = (
+                SELECT COUNT(*) FROM termometro t
+                LEFT JOIN status_diario s ON s.termometro_id = t.id AND s.data = :hoje
+                WHERE t.setor_id = setor.id AND s.id IS NULL
+            ),
+            qtd_incompletos = (
+                SELECT COUNT(*) FROM termometro t
+                JOIN status_diario s ON s.termometro_id = t.id AND s.data = :hoje
+                WHERE t.setor_id = setor.id AND NOT s.completo
+            ),
+            dia = :hoje
+    '''), {'hoje': hoje})
+
+
+def downgrade():
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('setor', sa.String(length=100), nullable=True))
+
+    op.execute('UPDATE termometro SET setor = (SELECT nome FROM setor WHERE setor.id = termometro.setor_id)')
+
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_termometro_setor_id_setor', type_='foreignkey')
+        batch_op.drop_index('ix_termometro_setor_id')
+        batch_op.drop_column('setor_id')
+
+    op.drop_table('setor')
@@ -0,0 +1,26 @@
+"""Índice composto verificacao(termometro_id, data_hora)
+
+Revision ID: 4b7e2c91d0a3
+Revises: 99dfe0bece60
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c91d0a3'
+down_revision = '99dfe0bece60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.create_index('ix_verificacao_termometro_id_data_hora', ['termometro_id', 'data_hora'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.drop_index('ix_verificacao_termometro_id_data_hora')
@@ -0,0 +1,29 @@
+"""Adiciona atualizado_em à verificacao
+
+Revision ID: 5e0b8a7c4d12
+Revises: c81d4f0a9e26
+Create Date: 2026-10-18 13:41:52.205533
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b8a7c4d12'
+down_revision = 'c81d4f0a9e26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('atualizado_em', sa.DateTime(), nullable=True))
+
+    # Leituras antigas: considera a própria data da leitura como última alteração
+    op.execute('UPDATE verificacao SET atualizado_em = data_hora WHERE atualizado_em IS NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.drop_column('atualizado_em')
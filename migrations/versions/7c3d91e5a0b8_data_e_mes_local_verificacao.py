@@ -0,0 +1,60 @@
+"""Dia e mês locais de SP gravados na verificacao
+
+Revision ID: 7c3d91e5a0b8
+Revises: e2a6c0b7f913
+Create Date: 2026-10-18 16:27:09.913840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import pandas as pd
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3d91e5a0b8'
+down_revision = 'e2a6c0b7f913'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 5000
+
+
+def upgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_sp', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('mes_sp', sa.String(length=7), nullable=True))
+
+    # Preenche as leituras existentes em lotes (por id), convertendo o fuso em bloco
+    conexao = op.get_bind()
+    selecionar = sa.text(
+        'SELECT id, data_hora FROM verificacao '
+        'WHERE id > :ultimo AND data_hora IS NOT NULL ORDER BY id LIMIT :lote'
+    )
+    atualizar = sa.text('UPDATE verificacao SET data_sp = :data_sp, mes_sp = :mes_sp WHERE id = :id')
+    ultimo = 0
+    while True:
+        linhas = conexao.execute(selecionar, {'ultimo': ultimo, 'lote': TAMANHO_LOTE}).fetchall()
+        if not linhas:
+            break
+        ids = [linha[0] for linha in linhas]
+        datas = (
+            pd.DatetimeIndex(pd.to_datetime([linha[1] for linha in linhas]))
+            .tz_localize('UTC').tz_convert('America/Sao_Paulo')
+        )
+        conexao.execute(atualizar, [
+            {'id': id_, 'data_sp': data, 'mes_sp': mes}
+            for id_, data, mes in zip(ids, datas.strftime('%Y-%m-%d'), datas.strftime('%Y-%m'))
+        ])
+        ultimo = ids[-1]
+
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.create_index('ix_verificacao_termometro_id_data_sp', ['termometro_id', 'data_sp'], unique=False)
+        batch_op.create_index('ix_verificacao_termometro_id_mes_sp', ['termometro_id', 'mes_sp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('verificacao', schema=None) as batch_op:
+        batch_op.drop_index('ix_verificacao_termometro_id_mes_sp')
+        batch_op.drop_index('ix_verificacao_termometro_id_data_sp')
+        batch_op.drop_column('mes_sp')
+        batch_op.drop_column('data_sp')
@@ -0,0 +1,32 @@
+"""Data de criação do termômetro
+
+Revision ID: 8e2f4a6b1c93
+Revises: 3a8c5f1d7e64
+Create Date: 2026-10-18 23:52:14.306718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f4a6b1c93'
+down_revision = '3a8c5f1d7e64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('criado_em', sa.DateTime(), nullable=True))
+
+    # Termômetros existentes: a data da migração (cada id ainda é de um só termômetro)
+    op.execute('UPDATE termometro SET criado_em = CURRENT_TIMESTAMP')
+
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.alter_column('criado_em', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('termometro', schema=None) as batch_op:
+        batch_op.drop_column('criado_em')
@@ -0,0 +1,77 @@
+"""Cria a tabela status_diario
+
+Revision ID: a3f19d6e2b57
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 10:03:27.540916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import pandas as pd
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f19d6e2b57'
+down_revision = '4b7e2c91d0a3'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 5000
+
+
+def upgrade():
+    op.create_table('status_diario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('termometro_id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('qtd_leituras', sa.Integer(), nullable=False),
+    sa.Column('completo', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['termometro_id'], ['termometro.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('termometro_id', 'data', name='uq_status_diario_termometro_data')
+    )
+    with op.batch_alter_table('status_diario', schema=None) as batch_op:
+        batch_op.create_index('ix_status_diario_data', ['data'], unique=False)
+
+    # Popula os dias já registrados, como status_diario.reconstruir_status_diario.
+    # O dia local de SP de cada leitura vai para uma tabela temporária (fuso
+    # convertido em bloco, em lotes por id) e a agregação é feita no banco.
+    conexao = op.get_bind()
+    conexao.execute(sa.text('CREATE TEMP TABLE dia_verificacao (id INTEGER PRIMARY KEY, dia DATE NOT NULL)'))
+    selecionar = sa.text(
+        'SELECT id, data_hora FROM verificacao '
+        'WHERE id > :ultimo AND data_hora IS NOT NULL ORDER BY id LIMIT :lote'
+    )
+    inserir = sa.text('INSERT INTO dia_verificacao (id, dia) VALUES (:id, :dia)')
+    ultimo = 0
+    while True:
+        linhas = conexao.execute(selecionar, {'ultimo': ultimo, 'lote': TAMANHO_LOTE}).fetchall()
+        if not linhas:
+            break
+        ids = [linha[0] for linha in linhas]
+        dias = (
+            pd.DatetimeIndex(pd.to_datetime([linha[1] for linha in linhas]))
+            .tz_localize('UTC').tz_convert('America/Sao_Paulo')
+            .strftime('%Y-%m-%d')
+        )
+        conexao.execute(inserir, [{'id': id_, 'dia': dia} for id_, dia in zip(ids, dias)])
+        ultimo = ids[-1]
+
+    conexao.execute(sa.text('''
+        INSERT INTO status_diario (termometro_id, data, qtd_leituras, completo)
+        SELECT v.termometro_id, d.dia,
+               COUNT(v.id),
+               MAX(CASE WHEN v.temperatura_max IS NOT NULL AND v.temperatura_min IS NOT NULL THEN 1 ELSE 0 END)
+        FROM verificacao v
+        JOIN dia_verificacao d ON d.id = v.id
+        WHERE v.termometro_id IS NOT NULL
+        GROUP BY v.termometro_id, d.dia
+    '''))
+    conexao.execute(sa.text('DROP TABLE dia_verificacao'))
+
+
+def downgrade():
+    with op.batch_alter_table('status_diario', schema=None) as batch_op:
+        batch_op.drop_index('ix_status_diario_data')
+
+    op.drop_table('status_diario')
@@ -0,0 +1,33 @@
+"""Cria a tabela lote_ingestao
+
+Revision ID: b4f2d8a61c37
+Revises: 7c3d91e5a0b8
+Create Date: 2026-10-18 18:02:44.518213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f2d8a61c37'
+down_revision = '7c3d91e5a0b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('lote_ingestao',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chave', sa.String(length=64), nullable=False),
+    sa.Column('origem', sa.String(length=100), nullable=True),
+    sa.Column('arquivo', sa.String(length=255), nullable=True),
+    sa.Column('qtd_leituras', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chave')
+    )
+
+
+def downgrade():
+    op.drop_table('lote_ingestao')
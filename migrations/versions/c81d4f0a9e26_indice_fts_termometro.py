@@ -0,0 +1,34 @@
+"""Índice FTS5 de busca de termômetros
+
+Revision ID: c81d4f0a9e26
+Revises: a3f19d6e2b57
+Create Date: 2026-10-18 11:20:05.774312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d4f0a9e26'
+down_revision = 'a3f19d6e2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE termometro_fts USING fts5(identificacao, equipamento, tokenize='trigram')"
+    )
+    op.execute(
+        "INSERT INTO termometro_fts(rowid, identificacao, equipamento) "
+        "SELECT id, coalesce(identificacao, ''), coalesce(equipamento, '') FROM termometro"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TABLE termometro_fts')
@@ -0,0 +1,38 @@
+"""Cria a tabela tarefa_exportacao
+
+Revision ID: e2a6c0b7f913
+Revises: 5e0b8a7c4d12
+Create Date: 2026-10-18 14:58:11.630417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6c0b7f913'
+down_revision = '5e0b8a7c4d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tarefa_exportacao',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('tipo', sa.String(length=30), nullable=False),
+    sa.Column('termometro_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('arquivo', sa.String(length=255), nullable=True),
+    sa.Column('nome_download', sa.String(length=100), nullable=True),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['termometro_id'], ['termometro.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('tarefa_exportacao')
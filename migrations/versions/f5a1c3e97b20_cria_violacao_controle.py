@@ -0,0 +1,43 @@
+"""Cria a tabela violacao_controle
+
+Revision ID: f5a1c3e97b20
+Revises: b4f2d8a61c37
+Create Date: 2026-10-18 19:11:05.274388
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5a1c3e97b20'
+down_revision = 'b4f2d8a61c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('violacao_controle',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('termometro_id', sa.Integer(), nullable=False),
+    sa.Column('verificacao_id', sa.Integer(), nullable=False),
+    sa.Column('regra', sa.String(length=30), nullable=False),
+    sa.Column('mes_sp', sa.String(length=7), nullable=False),
+    sa.Column('valor', sa.Float(), nullable=False),
+    sa.Column('media', sa.Float(), nullable=False),
+    sa.Column('desvio', sa.Float(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['termometro_id'], ['termometro.id'], ),
+    sa.ForeignKeyConstraint(['verificacao_id'], ['verificacao.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('verificacao_id', 'regra', name='uq_violacao_controle_verificacao_regra')
+    )
+    with op.batch_alter_table('violacao_controle', schema=None) as batch_op:
+        batch_op.create_index('ix_violacao_controle_termometro_id_mes_sp', ['termometro_id', 'mes_sp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('violacao_controle', schema=None) as batch_op:
+        batch_op.drop_index('ix_violacao_controle_termometro_id_mes_sp')
+
+    op.drop_table('violacao_controle')
@@ -1,5 +1,6 @@
 # preenhcer_carta.py
-import sqlite3, os, re, glob
+import sqlite3, os, re, glob, json, argparse, csv, shutil, tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from openpyxl import load_workbook
 from datetime import datetime, date
@@ -10,29 +11,35 @@ CAMINHO_DB = os.path.join("instance", "temperatura.db")
 PASTA_PLANILHAS = r"\\192.168.1.10\Acesso Restrito ISO\Área Técnica\Controles do Setor - MEIOS DE CULTURA\Cartas controle\Carta Controle - GMM-AT-483"
 PADRAO_ARQUIVO = "Termômetros - MM-05-AT-483"   # prefixo exibido no print
 
-# procura .xlsx/.xlsm começando com o prefixo acima
-candidatos = sorted(glob.glob(os.path.join(PASTA_PLANILHAS, PADRAO_ARQUIVO + "*.xls*")))
-if not candidatos:
-    # fallback: aceita também arquivos “MM-05-AT-483 …”
-    candidatos = sorted(glob.glob(os.path.join(PASTA_PLANILHAS, "*MM-05-AT-483*.xls*")))
-if not candidatos:
-    raise FileNotFoundError(f"Nenhum arquivo encontrado em:\n{PASTA_PLANILHAS}\n(padrões: '{PADRAO_ARQUIVO}*.xls*' ou '*MM-05-AT-483*.xls*')")
+# Marca d'água da sincronização incremental (última leitura já levada à planilha)
+CAMINHO_MARCA = os.path.join("instance", "carta_sync.json")
 
-# usa o mais recente
-candidatos.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-CAMINHO_PLANILHA = candidatos[0]
-print("Usando:", os.path.basename(CAMINHO_PLANILHA))
+LINHA_INICIAL = 17  # primeira linha de dados das abas
+
+
+def localiza_planilha():
+    # procura .xlsx/.xlsm começando com o prefixo acima
+    candidatos = sorted(glob.glob(os.path.join(PASTA_PLANILHAS, PADRAO_ARQUIVO + "*.xls*")))
+    if not candidatos:
+        # fallback: aceita também arquivos “MM-05-AT-483 …”
+        candidatos = sorted(glob.glob(os.path.join(PASTA_PLANILHAS, "*MM-05-AT-483*.xls*")))
+    if not candidatos:
+        raise FileNotFoundError(f"Nenhum arquivo encontrado em:\n{PASTA_PLANILHAS}\n(padrões: '{PADRAO_ARQUIVO}*.xls*' ou '*MM-05-AT-483*.xls*')")
+
+    # usa o mais recente
+    candidatos.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+    return candidatos[0]
 
 def normaliza(s: str) -> str:
     return re.sub(r"[^A-Z0-9]", "", str(s or "").upper())
 
-def encontra_aba(wb, identificacao: str):
-    if identificacao in wb.sheetnames:
-        return wb[identificacao]
+def encontra_titulo(sheetnames, identificacao: str):
+    if identificacao in sheetnames:
+        return identificacao
     id_norm = normaliza(identificacao)
-    for nome in wb.sheetnames:
+    for nome in sheetnames:
         if id_norm in normaliza(nome):
-            return wb[nome]
+            return nome
     return None
 
 def as_date(v):
@@ -43,56 +50,211 @@ def as_date(v):
     except:  # noqa
         return None
 
-# Carrega banco
-conn = sqlite3.connect(CAMINHO_DB)
-verificacoes = pd.read_sql_query("SELECT * FROM verificacao", conn)
-termometros  = pd.read_sql_query("SELECT * FROM termometro", conn)
-conn.close()
-
-verificacoes["data"] = pd.to_datetime(verificacoes["data_hora"]).dt.date
-verificacoes = verificacoes.merge(
-    termometros[["id","identificacao"]],
-    left_on="termometro_id", right_on="id", suffixes=("", "_termometro")
-)
-
-wb = load_workbook(CAMINHO_PLANILHA, data_only=True)
-
-inseridos = 0
-atualizados = 0
-
-for _, r in verificacoes.iterrows():
-    data          = r["data"]
-    temperatura   = r["temperatura_atual"]
-    responsavel   = r.get("responsavel", "")
-    identificacao = r["identificacao"]
-
-    ws = encontra_aba(wb, identificacao)
-    if ws is None:
-        ident_alt = re.sub(r"[^\w]", "-", identificacao)
-        ws = encontra_aba(wb, ident_alt)
-        if ws is None:
-            continue
+def le_marca():
+    if not os.path.exists(CAMINHO_MARCA):
+        return None
+    with open(CAMINHO_MARCA, encoding="utf-8") as f:
+        return json.load(f)
+
+def grava_marca(marca):
+    os.makedirs(os.path.dirname(CAMINHO_MARCA), exist_ok=True)
+    with open(CAMINHO_MARCA, "w", encoding="utf-8") as f:
+        json.dump(marca, f, indent=2)
+
+def carrega_leituras(marca=None):
+    """Leituras com a identificação do termômetro; com marca, só as novas ou alteradas depois dela."""
+    sql = """
+        SELECT v.id, v.data_hora, v.temperatura_atual, v.responsavel,
+               COALESCE(v.atualizado_em, v.data_hora) AS alterado_em,
+               t.identificacao
+        FROM verificacao v
+        JOIN termometro t ON t.id = v.termometro_id
+    """
+    params = ()
+    if marca:
+        sql += " WHERE v.id > ? OR COALESCE(v.atualizado_em, v.data_hora) > ?"
+        params = (marca["ultimo_id"], marca["ultima_alteracao"])
+
+    conn = sqlite3.connect(CAMINHO_DB)
+    try:
+        leituras = pd.read_sql_query(sql + " ORDER BY v.id", conn, params=params)
+    finally:
+        conn.close()
 
-    linha = 17
-    encontrou = False
-    while True:
-        valB = ws[f"B{linha}"].value
+    leituras["data"] = pd.to_datetime(leituras["data_hora"]).dt.date
+    return leituras
+
+def indexa_aba(ws):
+    """Lê a aba uma única vez: {(data, temperatura): (linha, analista)} e a primeira linha livre."""
+    indice = {}
+    linha = LINHA_INICIAL
+    # colunas B..M: B = data, C = temperatura, M = analista
+    for valores in ws.iter_rows(min_row=LINHA_INICIAL, min_col=2, max_col=13, values_only=True):
+        valB = valores[0] if valores else None
         if valB is None:
             break
-        if as_date(valB) == data and ws[f"C{linha}"].value == temperatura:
-            if not ws[f"M{linha}"].value:
-                ws[f"M{linha}"] = responsavel
-                atualizados += 1
-            encontrou = True
-            break
+        indice.setdefault((as_date(valB), valores[1]), (linha, valores[11] if len(valores) > 11 else None))
         linha += 1
+    return indice, linha
+
+def patches_da_aba(ws, leituras):
+    """Calcula as alterações de uma aba sem escrever nela.
+
+    'leituras' é uma lista de (data, temperatura, responsavel); cada leitura é
+    localizada em O(1) pelo índice da aba. Retorna uma lista de patches
+    {aba, celula, antes, depois, tipo}.
+    """
+    indice, proxima = indexa_aba(ws)
+    patches = []
+
+    for data, temperatura, responsavel in leituras:
+        encontrada = indice.get((data, temperatura))
+        if encontrada is not None:
+            linha, analista = encontrada
+            if not analista:
+                patches.append({"aba": ws.title, "celula": f"M{linha}", "antes": analista,
+                                "depois": responsavel, "tipo": "analista"})
+                indice[(data, temperatura)] = (linha, responsavel)
+            continue
+
+        linha = proxima
+        patches += [
+            {"aba": ws.title, "celula": f"B{linha}", "antes": None, "depois": data, "tipo": "insercao"},
+            {"aba": ws.title, "celula": f"C{linha}", "antes": None, "depois": temperatura, "tipo": "insercao"},
+            {"aba": ws.title, "celula": f"M{linha}", "antes": None, "depois": responsavel, "tipo": "insercao"},
+        ]
+        indice[(data, temperatura)] = (linha, responsavel)
+        proxima = linha + 1
+
+    return patches
+
+def _processa_abas(caminho_planilha, lote):
+    """Executado nos processos do pool: abre a planilha só para leitura e calcula os patches do lote de abas."""
+    wb = load_workbook(caminho_planilha, read_only=True, data_only=True)
+    try:
+        patches = []
+        for titulo, leituras in lote:
+            patches += patches_da_aba(wb[titulo], leituras)
+        return patches
+    finally:
+        wb.close()
+
+def agrupa_por_aba(sheetnames, leituras):
+    """{título da aba: [(data, temperatura, responsavel), ...]} (leituras sem aba são ignoradas)."""
+    abas = {}
+    por_aba = {}
+    for r in leituras.itertuples(index=False):
+        identificacao = r.identificacao
+        if identificacao not in abas:
+            titulo = encontra_titulo(sheetnames, identificacao)
+            if titulo is None:
+                ident_alt = re.sub(r"[^\w]", "-", identificacao)
+                titulo = encontra_titulo(sheetnames, ident_alt)
+            abas[identificacao] = titulo
+        titulo = abas[identificacao]
+        if titulo is None:
+            continue
+        por_aba.setdefault(titulo, []).append((r.data, r.temperatura_atual, r.responsavel))
+    return por_aba
+
+def calcula_patches(caminho_planilha, leituras, workers=None):
+    """Distribui as abas entre processos; cada um devolve os patches das suas abas."""
+    wb = load_workbook(caminho_planilha, read_only=True)
+    sheetnames = wb.sheetnames
+    wb.close()
+
+    por_aba = agrupa_por_aba(sheetnames, leituras)
+    if not por_aba:
+        return []
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(por_aba)))
+    itens = sorted(por_aba.items())
+    lotes = [itens[i::workers] for i in range(workers)]
+
+    if workers == 1:
+        return _processa_abas(caminho_planilha, lotes[0])
+
+    patches = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for resultado in pool.map(_processa_abas, [caminho_planilha] * len(lotes), lotes):
+            patches += resultado
+    return patches
+
+def aplica_patches(caminho_origem, caminho_destino, patches):
+    """Aplica todos os patches e salva a planilha uma única vez."""
+    wb = load_workbook(caminho_origem, data_only=True)
+    for patch in patches:
+        celula = wb[patch["aba"]][patch["celula"]]
+        celula.value = patch["depois"]
+        if patch["celula"].startswith("B") and patch["tipo"] == "insercao":
+            celula.number_format = "dd/mm/yyyy"
+    wb.save(caminho_destino)
+
+def relatorio_diff(patches, caminho_csv=None):
+    """Mostra (e opcionalmente grava em CSV) o que seria alterado na planilha."""
+    for patch in patches:
+        print(f"[{patch['tipo']}] {patch['aba']}!{patch['celula']}: {patch['antes']!r} -> {patch['depois']!r}")
+    if caminho_csv:
+        with open(caminho_csv, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=["aba", "celula", "antes", "depois", "tipo"], delimiter=";")
+            writer.writeheader()
+            writer.writerows(patches)
+        print("Relatório salvo em", caminho_csv)
+
+def conta(patches):
+    inseridos = sum(1 for p in patches if p["tipo"] == "insercao" and p["celula"].startswith("B"))
+    atualizados = sum(1 for p in patches if p["tipo"] == "analista")
+    return inseridos, atualizados
+
+def main():
+    parser = argparse.ArgumentParser(description="Preenche a carta controle com as leituras do sistema.")
+    parser.add_argument("--sincronizar", action="store_true",
+                        help="processa só as leituras novas/alteradas desde a última execução (marca d'água)")
+    parser.add_argument("--simular", action="store_true",
+                        help="não grava nada: só mostra o diff do que seria alterado")
+    parser.add_argument("--relatorio", metavar="ARQUIVO.csv",
+                        help="grava o diff em CSV (útil junto com --simular)")
+    parser.add_argument("--workers", type=int, help="processos em paralelo (padrão: nº de CPUs)")
+    args = parser.parse_args()
+
+    caminho_planilha = localiza_planilha()
+    print("Usando:", os.path.basename(caminho_planilha))
+
+    marca = le_marca() if args.sincronizar else None
+    leituras = carrega_leituras(marca)
+    if leituras.empty:
+        print("Nenhuma leitura nova desde a última sincronização.")
+        return
+
+    # Trabalha sobre uma cópia local: os processos leem do disco, não do compartilhamento de rede
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        copia_local = os.path.join(pasta_temp, os.path.basename(caminho_planilha))
+        shutil.copy2(caminho_planilha, copia_local)
+
+        patches = calcula_patches(copia_local, leituras, workers=args.workers)
+        inseridos, atualizados = conta(patches)
+
+        if args.simular or args.relatorio:
+            relatorio_diff(patches, args.relatorio)
+        if args.simular:
+            print(f"Simulação. Seriam inseridos: {inseridos} | Analistas atualizados: {atualizados}")
+            return
+
+        if patches:
+            aplica_patches(copia_local, caminho_planilha, patches)
 
-    if not encontrou:
-        ws[f"B{linha}"] = data
-        ws[f"B{linha}"].number_format = "dd/mm/yyyy"
-        ws[f"C{linha}"] = temperatura
-        ws[f"M{linha}"] = responsavel
-        inseridos += 1
+    # A marca só avança depois que a planilha foi salva
+    ultimo_id = int(leituras["id"].max())
+    ultima_alteracao = str(leituras["alterado_em"].max())
+    if marca:
+        ultimo_id = max(ultimo_id, marca["ultimo_id"])
+        ultima_alteracao = max(ultima_alteracao, marca["ultima_alteracao"])
+    grava_marca({
+        "ultimo_id": ultimo_id,
+        "ultima_alteracao": ultima_alteracao,
+        "sincronizado_em": datetime.now().isoformat(timespec="seconds"),
+    })
+    print(f"Concluído. Inseridos: {inseridos} | Analistas atualizados: {atualizados}")
 
-wb.save(CAMINHO_PLANILHA)
-print(f"Concluído. Inseridos: {inseridos} | Analistas atualizados: {atualizados}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from pathlib import Path
+import pytest
+from flask_migrate import upgrade
+from app import create_app, db
+from app.models import Usuario
+
+MIGRACOES = str(Path(__file__).resolve().parent.parent / 'migrations')
+
+
+@pytest.fixture
+def app_vazio(tmp_path):
+    """App do ambiente de teste com banco SQLite e pasta instance temporários, sem migrar."""
+    app = create_app('teste', {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "teste.db"}'})
+    app.instance_path = str(tmp_path / 'instance')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def app(app_vazio):
+    """app_vazio com todas as migrações aplicadas."""
+    upgrade(directory=MIGRACOES)
+    return app_vazio
+
+
+@pytest.fixture
+def admin(app):
+    """Cliente de teste logado como administrador."""
+    usuario = Usuario(username='admin', is_admin=True)
+    usuario.set_senha('senha')
+    db.session.add(usuario)
+    db.session.commit()
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['usuario_id'] = usuario.id
+        sessao['usuario_nome'] = usuario.username
+        sessao['is_admin'] = True
+    return cliente
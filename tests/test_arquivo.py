@@ -0,0 +1,74 @@
+from datetime import date, datetime
+from app import db
+from app.arquivo import anos_arquivados, arquivar, leituras_do_mes
+from app.estatistica import obter, registrar_insercao
+from app.models import StatusDiario, Termometro, Verificacao
+from app.status_diario import reconstruir_status_diario, regravar_status_diario
+
+
+def test_termometro_novo_com_id_reaproveitado_nao_herda_o_arquivo(app, admin):
+    antigo = Termometro(equipamento='Geladeira', identificacao='GMM-TD01')
+    db.session.add(antigo)
+    db.session.commit()
+    termometro_id = antigo.id
+    db.session.add(Verificacao(termometro_id=termometro_id, data_hora=datetime(2020, 3, 10, 15),
+                               temperatura_atual=4.0, responsavel='r'))
+    db.session.commit()
+    assert arquivar(2021) == (1, 1)
+    assert anos_arquivados(termometro_id) == [2020]
+
+    resposta = admin.post(f'/excluir-termometro/{termometro_id}')
+    assert resposta.status_code == 302
+
+    novo = Termometro(equipamento='Freezer', identificacao='GMM-TD02')
+    db.session.add(novo)
+    db.session.commit()
+    assert novo.id == termometro_id  # o SQLite reaproveita o maior id
+    assert anos_arquivados(novo.id) == []
+    assert leituras_do_mes(novo.id, '2020-03') == []
+
+
+def test_arquivar_incrementa_a_versao_dos_meses(app):
+    termometro = Termometro(equipamento='Geladeira', identificacao='GMM-TD01')
+    db.session.add(termometro)
+    db.session.commit()
+    for dia in (5, 6):
+        verificacao = Verificacao(termometro_id=termometro.id, data_hora=datetime(2020, 3, dia, 15),
+                                  temperatura_atual=4.0, responsavel='r')
+        db.session.add(verificacao)
+        registrar_insercao(verificacao)
+    db.session.commit()
+    versao = obter(termometro.id, '2020-03').versao
+
+    arquivar(2021)
+    db.session.expire_all()
+    assert obter(termometro.id, '2020-03').versao == versao + 1
+
+
+def test_reconstruir_status_diario_mantem_os_dias_arquivados(app):
+    termometro = Termometro(equipamento='Geladeira', identificacao='GMM-TD01')
+    db.session.add(termometro)
+    db.session.commit()
+    for dia in (5, 6, 7):
+        db.session.add(Verificacao(termometro_id=termometro.id, data_hora=datetime(2020, 3, dia, 15),
+                                   temperatura_atual=4.0, temperatura_max=6.0 if dia == 5 else None,
+                                   temperatura_min=2.0 if dia == 5 else None, responsavel='r'))
+    db.session.commit()
+    regravar_status_diario()
+    db.session.commit()
+    antes = [(s.data, s.qtd_leituras, s.completo) for s in StatusDiario.query.order_by(StatusDiario.data)]
+    assert len(antes) == 3
+
+    arquivar(2021)
+    # Leitura tardia de um dia já arquivado: soma à do arquivo
+    db.session.add(Verificacao(termometro_id=termometro.id, data_hora=datetime(2020, 3, 6, 18),
+                               temperatura_atual=4.5, responsavel='r'))
+    db.session.commit()
+
+    assert reconstruir_status_diario() == 3
+    depois = [(s.data, s.qtd_leituras, s.completo) for s in StatusDiario.query.order_by(StatusDiario.data)]
+    assert depois == [
+        (date(2020, 3, 5), 1, True),
+        (date(2020, 3, 6), 2, False),
+        (date(2020, 3, 7), 1, False),
+    ]
@@ -0,0 +1,10 @@
+from app import banco  # o nome teste_estresse seria coletado pelo pytest se importado direto
+from app.instance.config import AMBIENTES
+
+
+def test_pragmas_de_producao_sem_erros_de_lock():
+    resultado = banco.teste_estresse(AMBIENTES['producao'].SQLITE_PRAGMAS, escritores=4, leitores=4, operacoes=25)
+    assert resultado['journal_mode'] == 'wal'
+    assert resultado['erros_lock'] == 0
+    assert resultado['outros_erros'] == 0
+    assert resultado['escritas'] == 4 * 25
@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+from app.estatistica import registrar_insercao
+from app.models import Termometro, Verificacao
+
+
+def _termometro_com_leitura(identificacao, temperatura):
+    termometro = Termometro(equipamento='Geladeira', identificacao=identificacao)
+    db.session.add(termometro)
+    db.session.flush()
+    verificacao = Verificacao(termometro_id=termometro.id, data_hora=datetime(2024, 5, 10, 15),
+                              temperatura_atual=temperatura, responsavel='r')
+    db.session.add(verificacao)
+    registrar_insercao(verificacao)
+    db.session.commit()
+    return termometro
+
+
+def test_etag_nao_vale_para_termometro_novo_com_o_mesmo_id(app, admin):
+    antigo = _termometro_com_leitura('GMM-TD01', 4.0)
+    termometro_id = antigo.id
+    resposta = admin.get(f'/dados_carta_controle/{termometro_id}/05-2024')
+    etag = resposta.headers['ETag']
+    assert admin.get(f'/dados_carta_controle/{termometro_id}/05-2024',
+                     headers={'If-None-Match': etag}).status_code == 304
+
+    admin.post(f'/excluir-termometro/{termometro_id}')
+    novo = _termometro_com_leitura('GMM-TD02', 7.0)
+    assert novo.id == termometro_id  # o SQLite reaproveita o maior id
+
+    resposta = admin.get(f'/dados_carta_controle/{novo.id}/05-2024', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
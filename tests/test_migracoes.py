@@ -0,0 +1,26 @@
+from datetime import date
+from flask_migrate import upgrade
+from sqlalchemy import text
+from app import db
+from conftest import MIGRACOES
+
+
+def test_status_diario_populado_com_as_leituras_existentes(app_vazio):
+    upgrade(directory=MIGRACOES, revision='4b7e2c91d0a3')
+    db.session.execute(text("INSERT INTO termometro (id, identificacao) VALUES (1, 'GMM-TD01')"))
+    db.session.execute(text('''
+        INSERT INTO verificacao (termometro_id, data_hora, temperatura_atual, temperatura_max, temperatura_min) VALUES
+            (1, '2016-01-10 02:30:00', 4.0, NULL, NULL),  -- horário de verão (UTC-2): 0h30 do dia 10 em SP
+            (1, '2024-05-01 12:00:00', 4.0, 6.0, 2.0),
+            (1, '2024-05-01 13:00:00', 4.5, NULL, NULL)
+    '''))
+    db.session.commit()
+
+    upgrade(directory=MIGRACOES, revision='a3f19d6e2b57')
+    linhas = db.session.execute(text(
+        'SELECT termometro_id, data, qtd_leituras, completo FROM status_diario ORDER BY data'
+    )).all()
+    assert [(t, date.fromisoformat(d), q, bool(c)) for t, d, q, c in linhas] == [
+        (1, date(2016, 1, 10), 1, False),
+        (1, date(2024, 5, 1), 2, True),
+    ]